@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from api.cache import courier_cache
 from api.models import courier, order
 
 
@@ -27,18 +28,53 @@ class CourierWorkAdmin(admin.TabularInline):
     readonly_fields = ["courier_id"]
 
 
+class CourierRatingAdmin(admin.TabularInline):
+    model = courier.CourierRating
+    extra = 0
+    readonly_fields = [
+        "courier_id",
+        "region_id",
+        "delivery_time",
+        "delivery_count",
+        "last_complete_time",
+        "last_order_id",
+    ]
+
+
 @admin.register(courier.Courier)
 class Courier(admin.ModelAdmin):
-    inlines = [CourierRegionAdmin, CourierWorkAdmin]
+    inlines = [CourierRegionAdmin, CourierWorkAdmin, CourierRatingAdmin]
+    actions = ["check_orders", "check_capacity"]
     list_filter = ("type",)
     list_display = (
         "id",
         "type",
+        "earnings",
     )
+    readonly_fields = ("earnings", "summary_ready")
     list_display_links = ("id",)
     search_fields = ("id",)
     ordering = ("id",)
 
+    def check_orders(self, request, queryset):
+        released = order.Order.objects.filter(courier__in=queryset).release_unfit()
+        self.message_user(request, f"Снято заказов: {len(released)}")
+
+    check_orders.short_description = "Перепроверить заказы после смены графика"
+
+    def check_capacity(self, request, queryset):
+        released = order.Order.objects.filter(
+            courier__in=queryset
+        ).release_over_capacity()
+        self.message_user(request, f"Снято заказов: {len(released)}")
+
+    check_capacity.short_description = "Перепроверить заказы по грузоподъемности"
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.refresh_slots()
+        courier_cache.invalidate(form.instance.pk)
+
 
 class OrderDeliveryWorkAdmin(admin.TabularInline):
     model = order.OrderDelivery
@@ -61,3 +97,7 @@ class Order(admin.ModelAdmin):
     list_display_links = ("id",)
     search_fields = ("id", "weight")
     ordering = ("id",)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.refresh_slots()
@@ -1,5 +1,23 @@
 from django.apps import AppConfig
+from django.db.models.signals import (
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_delete,
+)
 
 
 class ApiConfig(AppConfig):
     name = "api"
+
+    def ready(self):
+        from api.cache import courier_types
+
+        courier_type = self.get_model("CourierType")
+        post_save.connect(courier_types.invalidate, sender=courier_type)
+        post_delete.connect(courier_types.invalidate, sender=courier_type)
+
+        open_order = self.get_model("OpenOrder")
+        post_save.connect(open_order.sync, sender=self.get_model("Order"))
+        pre_delete.connect(open_order.release_courier, sender=self.get_model("Courier"))
+        post_migrate.connect(open_order.backfill, sender=self)
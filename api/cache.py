@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class LRUCache:
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = (value, time.monotonic() + self.timeout)
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+class DjangoCache:
+    def __init__(self, alias, timeout):
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class DummyCache:
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+
+class CourierProfileCache:
+    """Read-through cache of GET /couriers/<id> payloads."""
+
+    prefix = "courier_profile"
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.name = None
+        self.backend = None
+
+    def get_backend(self):
+        name = settings.API_COURIER_CACHE
+        if name != self.name:
+            timeout = settings.API_COURIER_CACHE_TIMEOUT
+            if name == "lru":
+                self.backend = LRUCache(settings.API_COURIER_CACHE_SIZE, timeout)
+            elif name == "none":
+                self.backend = DummyCache()
+            else:
+                self.backend = DjangoCache(name, timeout)
+            self.name = name
+        return self.backend
+
+    def get_key(self, courier_id):
+        return f"{self.prefix}:{courier_id}"
+
+    def get_or_set(self, courier_id, callback):
+        backend = self.get_backend()
+        key = self.get_key(courier_id)
+        value = backend.get(key)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if value is None:
+            value = callback()
+            if value is not None:
+                backend.set(key, value)
+        return value
+
+    def invalidate(self, *courier_ids):
+        backend = self.get_backend()
+        keys = [self.get_key(courier_id) for courier_id in courier_ids]
+        for key in keys:
+            backend.delete(key)
+
+        def invalidate_on_commit():
+            for key in keys:
+                backend.delete(key)
+
+        transaction.on_commit(invalidate_on_commit)
+
+    def clear(self):
+        self.get_backend().clear()
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                "backend": settings.API_COURIER_CACHE,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+courier_cache = CourierProfileCache()
+
+
+class CourierTypeRegistry:
+    """In-process copy of the ``CourierType`` table."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.types = None
+        self.expires = 0
+
+    def all(self):
+        with self.lock:
+            if self.types is None or self.expires <= time.monotonic():
+                model = apps.get_model("api", "CourierType")
+                self.types = {obj.pk: obj for obj in model.objects.all()}
+                self.expires = time.monotonic() + settings.API_COURIER_TYPE_TIMEOUT
+            return self.types
+
+    def get(self, pk):
+        return self.all().get(pk)
+
+    def reset(self):
+        with self.lock:
+            self.types = None
+
+    def invalidate(self, **kwargs):
+        self.reset()
+        transaction.on_commit(self.reset)
+
+
+courier_types = CourierTypeRegistry()
@@ -0,0 +1,161 @@
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.utils.timezone import now
+
+from api.cache import courier_cache, courier_types
+from api.models.courier import Courier, CourierWork
+from api.models.order import Order, OrderDelivery
+from api.schedule import IntervalIndex, period_minutes
+
+
+def round_robin(candidates, capacities):
+    """Deal orders to couriers one at a time, in turns."""
+    taken = set()
+    chosen = defaultdict(list)
+    positions = dict.fromkeys(candidates, 0)
+    capacities = dict(capacities)
+    queue = deque(candidates)
+    while queue:
+        courier_id = queue.popleft()
+        orders = candidates[courier_id]
+        position = positions[courier_id]
+        while position < len(orders):
+            order = orders[position]
+            position += 1
+            if order.pk not in taken and order.weight <= capacities[courier_id]:
+                taken.add(order.pk)
+                chosen[courier_id].append(order)
+                capacities[courier_id] -= order.weight
+                break
+        positions[courier_id] = position
+        if position < len(orders) and capacities[courier_id] > 0:
+            queue.append(courier_id)
+    return chosen
+
+
+def get_couriers(courier_ids):
+    couriers = Courier.objects.filter(id__in=courier_ids).order_by("id")
+    if settings.API_ASSIGN_LOCKING:
+        couriers = couriers.select_for_update()
+    return list(
+        couriers.prefetch_related(
+            "regions",
+            Prefetch(
+                "working_hours",
+                queryset=CourierWork.objects.with_minutes().only("courier"),
+            ),
+        )
+    )
+
+
+def get_pool(regions, weight, slots=None):
+    orders = Order.objects.filter(
+        open_order__region__in=regions,
+        open_order__weight__lte=weight,
+        region__in=regions,
+        weight__lte=weight,
+        courier_id__isnull=True,
+        is_delivered=False,
+    )
+    if slots is not None:
+        orders = orders.fitting_slots(slots)
+    if settings.API_ASSIGN_LOCKING:
+        orders = orders.select_for_update(skip_locked=True)
+    pool = defaultdict(list)
+    delivery_hours = OrderDelivery.objects.with_minutes().only("order")
+    orders = orders.prefetch_related(
+        Prefetch("delivery_hours", queryset=delivery_hours)
+    )
+    for order in orders.order_by("id"):
+        pool[order.region].append(order)
+    return pool
+
+
+def index_pool(pool):
+    """An interval index per region, keyed by position in ``pool[region]``."""
+    return {
+        region: IntervalIndex(
+            (*period_minutes(delivery), key)
+            for key, order in enumerate(orders)
+            for delivery in order.delivery_hours.all()
+        )
+        for region, orders in pool.items()
+    }
+
+
+def eligible_orders(courier, regions, capacity, pool, indexes, slots=None):
+    visited = set()
+    eligible = []
+    for work_time in courier.working_hours.all():
+        period = period_minutes(work_time)
+        hits = [
+            pool[region][key]
+            for region in regions
+            if region in indexes
+            for key in indexes[region].overlapping(*period)
+        ]
+        for order in sorted(hits, key=lambda order: order.pk):
+            if order.pk in visited or order.weight > capacity:
+                continue
+            if slots is not None and not (order.slots is None or order.slots & slots):
+                continue
+            visited.add(order.pk)
+            eligible.append(order)
+    return eligible
+
+
+def assign_fleet(couriers):
+    """Assign open orders to many couriers at once, inside a transaction."""
+    result = {}
+    pending = defaultdict(list)
+    for courier_id, pk, assign_time in (
+        Order.objects.filter(courier__in=couriers, is_delivered=False)
+        .order_by("id")
+        .values_list("courier_id", "id", "assign_time")
+    ):
+        pending[courier_id].append((pk, assign_time))
+    for courier_id, orders in pending.items():
+        result[courier_id] = ([pk for pk, _ in orders], orders[0][1])
+
+    capacities = {}
+    regions = {}
+    slots = 0
+    for courier in couriers:
+        courier_type = courier_types.get(courier.type_id)
+        if courier.pk in result or courier_type is None:
+            continue
+        capacities[courier.pk] = courier_type.weight
+        regions[courier.pk] = {region.region_id for region in courier.regions.all()}
+        slots |= courier.stored_slots()
+
+    pool = get_pool(
+        set().union(*regions.values()),
+        max(capacities.values(), default=0),
+        slots if settings.API_SCHEDULE_SLOTS else None,
+    )
+    indexes = index_pool(pool)
+    candidates = {}
+    for courier in couriers:
+        if courier.pk not in capacities:
+            continue
+        candidates[courier.pk] = eligible_orders(
+            courier,
+            regions[courier.pk],
+            capacities[courier.pk],
+            pool,
+            indexes,
+            courier.stored_slots() if settings.API_SCHEDULE_SLOTS else None,
+        )
+
+    assign_time = now()
+    chosen = round_robin(candidates, capacities)
+    Order.objects.assign_many(chosen, assign_time)
+    courier_cache.invalidate(*chosen)
+
+    for courier in couriers:
+        if courier.pk not in result:
+            orders = sorted(order.pk for order in chosen.get(courier.pk, []))
+            result[courier.pk] = (orders, assign_time if orders else None)
+    return result
@@ -0,0 +1,87 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.timezone import now
+
+from api.models.courier import Courier
+from api.models.order import ArchivedOrder, Order
+
+
+class Command(BaseCommand):
+    help = "Move delivered orders older than a horizon into the archive table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, help="Archive orders completed this many days ago"
+        )
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep archiving every --interval seconds",
+        )
+        parser.add_argument("--interval", type=int)
+
+    def handle(self, *args, **options):
+        days = self.get_option(options, "days", settings.API_ARCHIVE_AFTER_DAYS)
+        batch_size = self.get_option(
+            options, "batch_size", settings.API_BULK_BATCH_SIZE
+        )
+        interval = self.get_option(options, "interval", settings.API_ARCHIVE_INTERVAL)
+
+        while True:
+            horizon = now() - timedelta(days=days)
+            archived = self.archive(horizon, batch_size)
+            self.stdout.write(
+                f"Archived orders completed before {horizon:%Y-%m-%d %H:%M}: {archived}"
+            )
+            if not options["loop"]:
+                break
+            time.sleep(interval)
+
+    def get_option(self, options, name, default):
+        value = options[name] if options[name] is not None else default
+        if value <= 0:
+            raise CommandError(f"--{name.replace('_', '-')} must be positive")
+        return value
+
+    def archive(self, horizon, batch_size):
+        orders = Order.objects.filter(
+            is_delivered=True, complete_time__lt=horizon
+        ).order_by("id")
+
+        archived = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    orders.select_for_update().prefetch_related("delivery_hours")[
+                        :batch_size
+                    ]
+                )
+                if not batch:
+                    return archived
+
+                couriers = Courier.objects.filter(
+                    id__in={order.courier_id for order in batch},
+                    summary_ready=False,
+                )
+                for courier in couriers:
+                    courier.ensure_summary()
+
+                archived_ids = set(
+                    ArchivedOrder.objects.filter(
+                        id__in=[order.pk for order in batch]
+                    ).values_list("id", flat=True)
+                )
+                ArchivedOrder.objects.bulk_create(
+                    [
+                        ArchivedOrder.from_order(order)
+                        for order in batch
+                        if order.pk not in archived_ids
+                    ]
+                )
+                Order.objects.filter(id__in=[order.pk for order in batch]).delete()
+            archived += len(batch)
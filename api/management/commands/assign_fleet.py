@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.dispatch import assign_fleet, get_couriers
+from api.models.courier import Courier
+
+
+class Command(BaseCommand):
+    help = "Assign open orders to many couriers in one transaction"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courier", type=int, nargs="*", dest="couriers")
+
+    def handle(self, *args, **options):
+        courier_ids = options["couriers"] or list(
+            Courier.objects.values_list("id", flat=True)
+        )
+        with transaction.atomic():
+            result = assign_fleet(get_couriers(courier_ids))
+
+        assigned = sum(len(orders) for orders, assign_time in result.values())
+        self.stdout.write(f"Couriers: {len(result)}, assigned orders: {assigned}")
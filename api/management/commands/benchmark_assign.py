@@ -0,0 +1,45 @@
+import random
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from api.strategies import STRATEGIES
+
+BenchmarkOrder = namedtuple("BenchmarkOrder", ["id", "weight"])
+
+
+class Command(BaseCommand):
+    help = "Compare load utilization and runtime of the assignment strategies"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=200)
+        parser.add_argument("--capacity", type=int, default=50)
+        parser.add_argument("--max-weight", type=int, default=20)
+        parser.add_argument("--rounds", type=int, default=100)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        capacity = options["capacity"]
+        samples = [
+            [
+                BenchmarkOrder(
+                    id=i,
+                    weight=Decimal(rng.randint(1, options["max_weight"] * 100)) / 100,
+                )
+                for i in range(options["orders"])
+            ]
+            for _ in range(options["rounds"])
+        ]
+
+        self.stdout.write(f"{'strategy':<10}{'utilization':>14}{'ms/round':>12}")
+        for name, strategy in STRATEGIES.items():
+            loaded = 0
+            started = time.perf_counter()
+            for orders in samples:
+                loaded += sum(order.weight for order in strategy(orders, capacity))
+            elapsed = (time.perf_counter() - started) * 1000 / len(samples)
+            utilization = loaded / (capacity * len(samples)) * 100
+            self.stdout.write(f"{name:<10}{utilization:>13.2f}%{elapsed:>12.3f}")
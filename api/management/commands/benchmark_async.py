@@ -0,0 +1,88 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from api.models.courier import Courier
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput of GET /couriers/<id> served by the synchronous "
+        "view and by its async variant under concurrent requests"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0,
+            help="Extra milliseconds added to every query to mimic a slow database",
+        )
+
+    def handle(self, *args, **options):
+        courier_ids = list(Courier.objects.values_list("id", flat=True)[:100])
+        if not courier_ids:
+            raise CommandError("No couriers to request, import some first")
+        for courier in Courier.objects.filter(id__in=courier_ids, summary_ready=False):
+            courier.ensure_summary()
+
+        paths = [courier_ids[i % len(courier_ids)] for i in range(options["requests"])]
+        latency = options["latency"] / 1000
+
+        def slow_query(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_latency(connection, **kwargs):
+            if slow_query not in connection.execute_wrappers:
+                connection.execute_wrappers.append(slow_query)
+
+        if latency:
+            for connection in connections.all():
+                add_latency(connection)
+            connection_created.connect(add_latency)
+
+        with override_settings(ALLOWED_HOSTS=["testserver"], API_COURIER_CACHE="none"):
+            sync_elapsed = self.run_sync(paths, options["concurrency"])
+            async_elapsed = asyncio.run(self.run_async(paths, options["concurrency"]))
+
+        connection_created.disconnect(add_latency)
+        total = len(paths)
+        self.stdout.write(f"{'path':<8}{'requests/s':>14}{'seconds':>10}")
+        self.stdout.write(
+            f"{'wsgi':<8}{total / sync_elapsed:>14.1f}{sync_elapsed:>10.2f}"
+        )
+        self.stdout.write(
+            f"{'asgi':<8}{total / async_elapsed:>14.1f}{async_elapsed:>10.2f}"
+        )
+
+    def run_sync(self, courier_ids, concurrency):
+        def get(courier_id):
+            url = reverse("api:courier_edit", kwargs={"courier_id": courier_id})
+            return Client().get(url).status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(get, courier_ids))
+        return time.perf_counter() - started
+
+    async def run_async(self, courier_ids, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def get(courier_id):
+            url = reverse("api:async_courier", kwargs={"courier_id": courier_id})
+            async with semaphore:
+                return (await client.get(url)).status_code
+
+        started = time.perf_counter()
+        await asyncio.gather(*(get(courier_id) for courier_id in courier_ids))
+        return time.perf_counter() - started
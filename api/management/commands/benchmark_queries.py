@@ -0,0 +1,189 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test import override_settings
+from django.utils.timezone import now
+from rest_framework.test import APIRequestFactory
+
+from api.cache import courier_types
+from api.models.courier import Courier, CourierRegion, CourierWork
+from api.models.order import Order, OrderDelivery
+from api.views.courier import CourierView
+from api.views.order import OrderAssignView, OrderCompleteView
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with generated couriers and orders, print EXPLAIN "
+        "plans of the hot queries and latency of assign/complete/detail"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=100000)
+        parser.add_argument("--couriers", type=int, default=1000)
+        parser.add_argument("--regions", type=int, default=100)
+        parser.add_argument("--rounds", type=int, default=100)
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep generated data instead of rolling it back",
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.options = options
+        self.factory = APIRequestFactory()
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            couriers = self.create_couriers()
+            self.create_orders(couriers)
+            self.stdout.write(
+                f"Generated {options['orders']} orders for {len(couriers)} couriers "
+                f"in {time.perf_counter() - started:.1f}s on {connection.vendor}"
+            )
+
+            sample = self.rng.sample(couriers, min(options["rounds"], len(couriers)))
+            self.explain(sample[0])
+            with override_settings(API_COURIER_CACHE="none"):
+                self.measure("assign", sample, self.assign)
+                self.measure("complete", sample, self.complete)
+                self.measure("detail", sample, self.detail)
+
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+    def create_couriers(self):
+        types = list(courier_types.all())
+        start = Courier.objects.aggregate(Max("id"))["id__max"] or 0
+        couriers = Courier.objects.bulk_create(
+            [
+                Courier(id=start + i + 1, type_id=self.rng.choice(types))
+                for i in range(self.options["couriers"])
+            ]
+        )
+        CourierRegion.objects.bulk_create(
+            [
+                CourierRegion(courier_id=courier.pk, region_id=region)
+                for courier in couriers
+                for region in self.rng.sample(range(1, self.options["regions"] + 1), 3)
+            ]
+        )
+        CourierWork.objects.bulk_create(
+            [
+                CourierWork(courier_id=courier.pk, time_from="09:00", time_to="18:00")
+                for courier in couriers
+            ]
+        )
+        return [courier.pk for courier in couriers]
+
+    def create_orders(self, couriers):
+        start = Order.objects.aggregate(Max("id"))["id__max"] or 0
+        batch_size = self.options["batch_size"]
+        complete_time = now()
+        for offset in range(0, self.options["orders"], batch_size):
+            orders = []
+            for i in range(offset, min(offset + batch_size, self.options["orders"])):
+                order = Order(
+                    id=start + i + 1,
+                    region=self.rng.randint(1, self.options["regions"]),
+                    weight=Decimal(self.rng.randint(1, 5000)) / 100,
+                )
+                if self.rng.random() < 0.8:
+                    order.courier_id = self.rng.choice(couriers)
+                    order.is_delivered = True
+                    order.assign_time = complete_time - timedelta(hours=1)
+                    order.complete_time = complete_time
+                orders.append(order)
+            Order.objects.bulk_create(orders)
+
+            hours = []
+            for order in orders:
+                hour = self.rng.randint(0, 22)
+                hours.append(
+                    OrderDelivery(
+                        order_id=order.pk,
+                        time_from=f"{hour:02d}:00",
+                        time_to=f"{hour + 1:02d}:00",
+                    )
+                )
+            OrderDelivery.objects.bulk_create(hours)
+
+    def explain(self, courier_id):
+        regions = list(
+            CourierRegion.objects.filter(courier_id=courier_id).values_list(
+                "region_id", flat=True
+            )
+        )
+        queries = {
+            "free orders": Order.objects.filter(
+                courier_id__isnull=True, region__in=regions, weight__lte=50
+            ),
+            "open-order pool": Order.objects.filter(
+                open_order__region__in=regions,
+                open_order__weight__lte=50,
+                region__in=regions,
+                weight__lte=50,
+                courier_id__isnull=True,
+                is_delivered=False,
+            ),
+            "current orders": Order.objects.filter(
+                courier_id=courier_id, is_delivered=False
+            ),
+            "delivered by region": Order.objects.filter(
+                courier_id=courier_id, is_delivered=True, region__in=regions
+            ).order_by("region", "id"),
+            "courier regions": CourierRegion.objects.filter(
+                courier_id=courier_id, region_id__in=regions
+            ),
+        }
+        for name, queryset in queries.items():
+            self.stdout.write(f"-- {name}")
+            self.stdout.write(queryset.explain())
+
+    def assign(self, courier_id):
+        request = self.factory.post(
+            "/orders/assign", {"courier_id": courier_id}, format="json"
+        )
+        return OrderAssignView.as_view()(request)
+
+    def complete(self, courier_id):
+        order_id = (
+            Order.objects.filter(courier_id=courier_id, is_delivered=False)
+            .values_list("id", flat=True)
+            .first()
+        )
+        request = self.factory.post(
+            "/orders/complete",
+            {
+                "courier_id": courier_id,
+                "order_id": order_id,
+                "complete_time": now().isoformat(),
+            },
+            format="json",
+        )
+        return OrderCompleteView.as_view()(request)
+
+    def detail(self, courier_id):
+        request = self.factory.get(f"/couriers/{courier_id}")
+        return CourierView.as_view()(request, courier_id=courier_id)
+
+    def measure(self, name, couriers, call):
+        timings = []
+        for courier_id in couriers:
+            started = time.perf_counter()
+            call(courier_id)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) > 1 else timings[0]
+        self.stdout.write(
+            f"{name:<10}mean {statistics.mean(timings):8.3f} ms  p95 {p95:8.3f} ms"
+        )
@@ -0,0 +1,103 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.schedule import IntervalIndex, schedule_slots
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare eligibility checks of working and delivery hours: pairwise "
+        "interval loops, the interval index and the slot bitmap prefilter"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=1000)
+        parser.add_argument("--periods", type=int, default=3)
+        parser.add_argument("--max-length", type=int, default=180)
+        parser.add_argument("--rounds", type=int, default=100)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.options = options
+        samples = [
+            (
+                self.periods(options["periods"]),
+                [self.periods(options["periods"]) for _ in range(options["orders"])],
+            )
+            for _ in range(options["rounds"])
+        ]
+        prepared = [
+            (
+                working_hours,
+                schedule_slots(working_hours),
+                [(schedule_slots(periods), periods) for periods in orders],
+            )
+            for working_hours, orders in samples
+        ]
+
+        results = {}
+        self.stdout.write(f"{'check':<10}{'eligible':>10}{'ms/round':>12}")
+        for name, check, data in (
+            ("loops", self.loops, samples),
+            ("index", self.index, samples),
+            ("bitmap", self.bitmap, prepared),
+        ):
+            eligible = 0
+            started = time.perf_counter()
+            for sample in data:
+                found = check(*sample)
+                eligible += len(found)
+                results.setdefault(name, []).append(found)
+            elapsed = (time.perf_counter() - started) * 1000 / len(data)
+            self.stdout.write(f"{name:<10}{eligible:>10}{elapsed:>12.3f}")
+
+        if not results["loops"] == results["index"] == results["bitmap"]:
+            self.stderr.write("Checks disagree on eligible orders")
+
+    def periods(self, count):
+        periods = []
+        for _ in range(self.rng.randint(1, count)):
+            time_from = self.rng.randrange(24 * 60)
+            length = self.rng.randint(0, self.options["max_length"])
+            periods.append((time_from, min(time_from + length, 24 * 60 - 1)))
+        return periods
+
+    def loops(self, working_hours, orders):
+        eligible = []
+        for key, periods in enumerate(orders):
+            for time_from, time_to in working_hours:
+                if any(
+                    time_from <= start < time_to or time_from < end <= time_to
+                    for start, end in periods
+                ):
+                    eligible.append(key)
+                    break
+        return eligible
+
+    def index(self, working_hours, orders):
+        index = IntervalIndex(
+            (start, end, key)
+            for key, periods in enumerate(orders)
+            for start, end in periods
+        )
+        keys = set()
+        for time_from, time_to in working_hours:
+            keys.update(index.overlapping(time_from, time_to))
+        return sorted(keys)
+
+    def bitmap(self, working_hours, slots, orders):
+        candidates = [
+            (key, periods)
+            for key, (order_slots, periods) in enumerate(orders)
+            if order_slots & slots
+        ]
+        index = IntervalIndex(
+            (start, end, key) for key, periods in candidates for start, end in periods
+        )
+        keys = set()
+        for time_from, time_to in working_hours:
+            keys.update(index.overlapping(time_from, time_to))
+        return sorted(keys)
@@ -0,0 +1,148 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from api.cache import courier_types
+from api.models.courier import Courier
+from api.serializers.courier import (
+    CourierRetrieveSerializer,
+    CourierSerializer,
+    create_couriers,
+)
+from api.serializers.fast import (
+    FastCourierSerializer,
+    FastOrdersSerializer,
+    courier_representation,
+)
+from api.serializers.order import OrdersSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the DRF serializers with the API_FAST_SERIALIZERS ones on "
+        "generated courier/order imports and courier profiles"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=1000)
+        parser.add_argument("--profiles", type=int, default=200)
+        parser.add_argument("--rounds", type=int, default=5)
+        parser.add_argument(
+            "--invalid",
+            type=float,
+            default=0.1,
+            help="Share of items with a broken field",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.options = options
+        types = list(courier_types.all())
+        if not types:
+            raise CommandError("No courier types, load api/fixtures first")
+
+        couriers = [self.courier(pk, types) for pk in range(1, options["items"] + 1)]
+        orders = [self.order(pk) for pk in range(1, options["items"] + 1)]
+
+        self.stdout.write(f"{'case':<18}{'drf ms':>10}{'fast ms':>10}{'speedup':>10}")
+        self.compare(
+            "couriers import",
+            lambda: self.validate(CourierSerializer, couriers),
+            lambda: self.validate(FastCourierSerializer, couriers),
+        )
+        self.compare(
+            "orders import",
+            lambda: self.validate(OrdersSerializer, orders),
+            lambda: self.validate(FastOrdersSerializer, orders),
+        )
+
+        with transaction.atomic():
+            first = (Courier.objects.aggregate(Max("id"))["id__max"] or 0) + 1
+            valid = [
+                self.courier(pk, types, broken=False)
+                for pk in range(first, first + options["profiles"])
+            ]
+            serializer = CourierSerializer(data=valid, many=True)
+            serializer.is_valid(raise_exception=True)
+            create_couriers([dict(item) for item in serializer.validated_data])
+            profiles = list(
+                Courier.objects.filter(id__gte=first)
+                .prefetch_related("regions", "working_hours", "ratings")
+                .order_by("id")
+            )
+            for courier in profiles:
+                courier.ensure_summary()
+            self.compare(
+                "courier profile",
+                lambda: [dict(CourierRetrieveSerializer(c).data) for c in profiles],
+                lambda: [courier_representation(c) for c in profiles],
+            )
+            transaction.set_rollback(True)
+
+    def courier(self, pk, types, broken=None):
+        item = {
+            "courier_id": pk,
+            "courier_type": self.rng.choice(types),
+            "regions": self.rng.sample(range(1, 100), self.rng.randint(1, 5)),
+            "working_hours": [self.period() for _ in range(self.rng.randint(1, 3))],
+        }
+        return self.break_item(item, broken)
+
+    def order(self, pk, broken=None):
+        item = {
+            "order_id": pk,
+            "weight": self.rng.randint(1, 5000) / 100,
+            "region": self.rng.randint(1, 100),
+            "delivery_hours": [self.period() for _ in range(self.rng.randint(1, 3))],
+        }
+        return self.break_item(item, broken)
+
+    def period(self):
+        start = self.rng.randrange(23 * 60)
+        end = self.rng.randint(start, 24 * 60 - 1)
+        return f"{start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}"
+
+    def break_item(self, item, broken):
+        if broken is None:
+            broken = self.rng.random() < self.options["invalid"]
+        if broken:
+            key = self.rng.choice(list(item)[1:])
+            item[key] = self.rng.choice([None, "", "x", [None]])
+        return item
+
+    def validate(self, serializer_class, data):
+        serializer = serializer_class(data=data, many=True)
+        serializer.is_valid()
+        validated_data = [
+            {
+                key: (
+                    [(each.time_from, each.time_to) for each in value]
+                    if key == "delivery_hours"
+                    else value
+                )
+                for key, value in item.items()
+            }
+            for item in serializer.validated_data
+        ]
+        return serializer.errors, validated_data
+
+    def compare(self, name, drf, fast):
+        timings = {}
+        results = {}
+        for key, run in (("drf", drf), ("fast", fast)):
+            started = time.perf_counter()
+            for _ in range(self.options["rounds"]):
+                results[key] = run()
+            timings[key] = (
+                (time.perf_counter() - started) * 1000 / self.options["rounds"]
+            )
+        speedup = timings["drf"] / timings["fast"] if timings["fast"] else 0
+        self.stdout.write(
+            f"{name:<18}{timings['drf']:>10.2f}{timings['fast']:>10.2f}{speedup:>9.1f}x"
+        )
+        if repr(results["drf"]) != repr(results["fast"]):
+            self.stderr.write(f"{name}: results differ")
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.cache import courier_cache, courier_types
+from api.models.courier import Courier
+from api.models.order import Order
+
+
+class Command(BaseCommand):
+    help = "Change the type of many couriers and release orders over the new capacity"
+
+    def add_arguments(self, parser):
+        parser.add_argument("courier_type")
+        parser.add_argument("--courier", type=int, nargs="*", dest="couriers")
+        parser.add_argument("--from-type", dest="from_type")
+
+    def handle(self, *args, **options):
+        courier_type = courier_types.get(options["courier_type"])
+        if courier_type is None:
+            raise CommandError(f"Unknown courier type {options['courier_type']}")
+
+        couriers = Courier.objects.all()
+        if options["couriers"]:
+            couriers = couriers.filter(id__in=options["couriers"])
+        if options["from_type"]:
+            couriers = couriers.filter(type_id=options["from_type"])
+
+        with transaction.atomic():
+            courier_ids = list(
+                couriers.select_for_update().values_list("id", flat=True)
+            )
+            Courier.objects.filter(id__in=courier_ids).update(type=courier_type)
+            released = Order.objects.filter(
+                courier_id__in=courier_ids
+            ).release_over_capacity(
+                {courier_id: courier_type.weight for courier_id in courier_ids}
+            )
+        courier_cache.invalidate(*courier_ids)
+
+        self.stdout.write(
+            f"Couriers changed: {len(courier_ids)}, orders released: {len(released)}"
+        )
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import courier_cache
+from api.models.courier import Courier
+
+
+class Command(BaseCommand):
+    help = "Rebuild courier earnings and rating summaries from orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courier", type=int, nargs="*", dest="couriers")
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report couriers whose stored summary differs from orders",
+        )
+
+    def handle(self, *args, **options):
+        couriers = Courier.objects.order_by("id")
+        if options["couriers"]:
+            couriers = couriers.filter(id__in=options["couriers"])
+
+        mismatched = 0
+        for courier in couriers.iterator():
+            if options["check"]:
+                if courier.summary_ready and not self.is_consistent(courier):
+                    mismatched += 1
+                    self.stdout.write(f"Courier {courier.pk}: summary is inconsistent")
+            else:
+                courier.rebuild_summary()
+                courier_cache.invalidate(courier.pk)
+
+        if options["check"]:
+            self.stdout.write(f"Inconsistent summaries: {mismatched}")
+        else:
+            self.stdout.write(f"Rebuilt summaries: {couriers.count()}")
+
+    def is_consistent(self, courier):
+        if courier.earnings != courier.collect_earnings():
+            return False
+        stored = {
+            rating.region_id: (rating.delivery_time, rating.delivery_count)
+            for rating in courier.ratings.all()
+            if rating.delivery_count
+        }
+        collected = {
+            rating.region_id: (rating.delivery_time, rating.delivery_count)
+            for rating in courier.collect_ratings()
+        }
+        return stored == collected
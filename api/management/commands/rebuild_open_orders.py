@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models.order import OpenOrder, Order
+
+
+class Command(BaseCommand):
+    help = "Rebuild the open-order pool from unassigned orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report orders missing from or stale in the pool",
+        )
+
+    def handle(self, *args, **options):
+        orders = Order.objects.filter(courier_id__isnull=True, is_delivered=False)
+
+        if options["check"]:
+            missing = orders.filter(open_order__isnull=True).count()
+            stale = OpenOrder.objects.exclude(order__in=orders).count()
+            self.stdout.write(f"Missing orders: {missing}, stale orders: {stale}")
+            return
+
+        with transaction.atomic():
+            OpenOrder.objects.all().delete()
+            OpenOrder.objects.bulk_create(
+                (OpenOrder.from_order(order) for order in orders.iterator()),
+                batch_size=settings.API_BULK_BATCH_SIZE,
+            )
+        self.stdout.write(f"Open orders: {OpenOrder.objects.count()}")
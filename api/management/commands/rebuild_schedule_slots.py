@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+
+from api.models.courier import Courier, CourierWork
+from api.models.order import Order, OrderDelivery
+
+
+class Command(BaseCommand):
+    help = "Rebuild schedule slot bitmaps of couriers and undelivered orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report rows with a missing or stale bitmap",
+        )
+
+    def handle(self, *args, **options):
+        targets = [
+            (Courier.objects.all(), "working_hours", CourierWork),
+            (Order.objects.filter(is_delivered=False), "delivery_hours", OrderDelivery),
+        ]
+        for queryset, field, period_model in targets:
+            periods = period_model.objects.with_minutes()
+            queryset = queryset.prefetch_related(Prefetch(field, queryset=periods))
+            stale = self.rebuild(queryset, check=options["check"])
+            self.stdout.write(f"{queryset.model.__name__} stale bitmaps: {stale}")
+
+    def rebuild(self, queryset, check):
+        batch_size = settings.API_BULK_BATCH_SIZE
+        stale = []
+        ids = list(queryset.order_by("id").values_list("id", flat=True))
+        for start in range(0, len(ids), batch_size):
+            for instance in queryset.filter(id__in=ids[start : start + batch_size]):
+                slots = instance.collect_slots()
+                if instance.slots != slots:
+                    instance.set_slots(slots)
+                    stale.append(instance)
+        if not check:
+            with transaction.atomic():
+                queryset.model.objects.bulk_update(
+                    stale, ["slots_am", "slots_pm"], batch_size=batch_size
+                )
+        return len(stale)
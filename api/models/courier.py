@@ -1,6 +1,82 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import ExtractHour, ExtractMinute
 from django.utils.timezone import now
 
+from api.schedule import (
+    IntervalIndex,
+    format_minutes,
+    join_slots,
+    period_minutes,
+    schedule_slots,
+    split_slots,
+)
+from api.strategies import get_strategy
+
+
+class PeriodQuerySet(models.QuerySet):
+    def with_minutes(self):
+        return self.annotate(
+            minute_from=ExtractHour("time_from") * 60 + ExtractMinute("time_from"),
+            minute_to=ExtractHour("time_to") * 60 + ExtractMinute("time_to"),
+        )
+
+
+class SlotsQuerySet(models.QuerySet):
+    def fitting_slots(self, slots):
+        """Rows whose schedule may overlap ``slots``, or that have no bitmap."""
+        slots_am, slots_pm = split_slots(slots)
+        return self.annotate(
+            slots_am_hit=F("slots_am").bitand(slots_am),
+            slots_pm_hit=F("slots_pm").bitand(slots_pm),
+        ).filter(
+            Q(slots_am__isnull=True)
+            | Q(slots_pm__isnull=True)
+            | Q(slots_am_hit__gt=0)
+            | Q(slots_pm_hit__gt=0)
+        )
+
+
+class ScheduleSlots(models.Model):
+    """15-minute slots of a schedule as a bitmap split into two columns."""
+
+    schedule_field = None
+
+    slots_am = models.BigIntegerField(
+        "Слоты графика до 12:00", null=True, blank=True, editable=False
+    )
+    slots_pm = models.BigIntegerField(
+        "Слоты графика после 12:00", null=True, blank=True, editable=False
+    )
+
+    class Meta:
+        abstract = True
+
+    @property
+    def slots(self):
+        if self.slots_am is None or self.slots_pm is None:
+            return None
+        return join_slots(self.slots_am, self.slots_pm)
+
+    def set_slots(self, slots):
+        self.slots_am, self.slots_pm = split_slots(slots)
+
+    def collect_slots(self):
+        periods = getattr(self, self.schedule_field).all()
+        return schedule_slots(period_minutes(period) for period in periods)
+
+    def stored_slots(self):
+        slots = self.slots
+        return self.collect_slots() if slots is None else slots
+
+    def refresh_slots(self):
+        periods = getattr(self, self.schedule_field).with_minutes()
+        self.set_slots(schedule_slots(period_minutes(period) for period in periods))
+        type(self).objects.filter(pk=self.pk).update(
+            slots_am=self.slots_am, slots_pm=self.slots_pm
+        )
+
 
 class CourierType(models.Model):
     id = models.CharField(primary_key=True, max_length=255)
@@ -15,9 +91,11 @@ class CourierType(models.Model):
         return self.id
 
 
-class Courier(models.Model):
+class Courier(ScheduleSlots):
     NULL_ORDER_DATA = {"courier_id": None, "assign_time": None}
 
+    schedule_field = "working_hours"
+
     type = models.ForeignKey(
         CourierType,
         on_delete=models.SET_NULL,
@@ -26,6 +104,12 @@ class Courier(models.Model):
         null=True,
         blank=True,
     )
+    earnings = models.DecimalField(
+        "Заработок", default=0, max_digits=12, decimal_places=2
+    )
+    summary_ready = models.BooleanField("Сводка рассчитана", default=False)
+
+    objects = SlotsQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Курьер"
@@ -44,20 +128,17 @@ class Courier(models.Model):
 
     @property
     def rating(self):
-        regions_mean = []
-        for region in self.regions.all():
-            region_mean = []
-            times = self.orders.filter(is_delivered=True, region=region.region_id).all()
-            times_len = len(times)
-            for i in range(times_len):
-                if i == 0:
-                    value = times[i].complete_time - times[i].assign_time
-                else:
-                    value = times[i].complete_time - times[i - 1].complete_time
-                region_mean.append(value.seconds)
-            if times_len:
-                regions_mean.append(sum(region_mean) / times_len)
+        if self.summary_ready:
+            ratings = self.ratings.all()
+        else:
+            ratings = self.collect_ratings()
 
+        region_ids = {region.region_id for region in self.regions.all()}
+        regions_mean = [
+            rating.delivery_time / rating.delivery_count
+            for rating in ratings
+            if rating.region_id in region_ids and rating.delivery_count
+        ]
         if regions_mean == list():
             return None
 
@@ -65,66 +146,137 @@ class Courier(models.Model):
         rating = (60 * 60 - min(t, 60 * 60)) / (60 * 60) * 5
         return round(rating, 2)
 
+    def collect_ratings(self, regions=None):
+        ratings = {}
+        fields = ("region", "id", "assign_time", "complete_time")
+        orders = self.orders.filter(is_delivered=True)
+        archived = self.archived_orders.all()
+        if regions is not None:
+            orders = orders.filter(region__in=regions)
+            archived = archived.filter(region__in=regions)
+        orders = list(orders.values_list(*fields)) + list(archived.values_list(*fields))
+        for region, pk, assign_time, complete_time in sorted(orders):
+            rating = ratings.get(region)
+            if rating is None:
+                rating = CourierRating(courier=self, region_id=region)
+                ratings[region] = rating
+            rating.add(pk, assign_time, complete_time)
+        return list(ratings.values())
+
+    def collect_earnings(self):
+        earnings = self.orders.filter(is_delivered=True).aggregate(
+            Sum("courier_price")
+        )["courier_price__sum"]
+        archived = self.archived_orders.aggregate(Sum("courier_price"))[
+            "courier_price__sum"
+        ]
+        return (earnings or 0) + (archived or 0)
+
+    def rebuild_summary(self):
+        with transaction.atomic():
+            type(self).objects.select_for_update().get(pk=self.pk)
+            earnings = self.collect_earnings()
+            CourierRating.objects.filter(courier_id=self.pk).delete()
+            CourierRating.objects.bulk_create(self.collect_ratings())
+            type(self).objects.filter(pk=self.pk).update(
+                earnings=earnings, summary_ready=True
+            )
+        self.earnings = earnings
+        self.summary_ready = True
+        getattr(self, "_prefetched_objects_cache", {}).pop("ratings", None)
+
+    def ensure_summary(self):
+        if self.summary_ready:
+            return
+        with transaction.atomic():
+            courier = type(self).objects.select_for_update().get(pk=self.pk)
+            if courier.summary_ready:
+                self.earnings = courier.earnings
+                self.summary_ready = True
+            else:
+                self.rebuild_summary()
+
+    def add_delivery(self, order):
+        self.add_deliveries([order])
+
+    def add_deliveries(self, orders):
+        with transaction.atomic():
+            courier = type(self).objects.select_for_update().get(pk=self.pk)
+            if not courier.summary_ready:
+                return
+            type(self).objects.filter(pk=self.pk).update(
+                earnings=F("earnings") + sum(order.courier_price for order in orders)
+            )
+            regions = {}
+            for order in sorted(orders, key=lambda order: order.pk):
+                regions.setdefault(order.region, []).append(order)
+            stale = []
+            for region, region_orders in regions.items():
+                (
+                    rating,
+                    created,
+                ) = CourierRating.objects.select_for_update().get_or_create(
+                    courier_id=self.pk, region_id=region
+                )
+                if not rating.follows(region_orders[0].pk):
+                    stale.append(region)
+                    continue
+                for order in region_orders:
+                    rating.add(order.pk, order.assign_time, order.complete_time)
+                rating.save()
+            if stale:
+                CourierRating.objects.filter(
+                    courier_id=self.pk, region_id__in=stale
+                ).delete()
+                CourierRating.objects.bulk_create(self.collect_ratings(stale))
+
     def need_change_order_weight(self, courier_type):
         need_change = {"car": ["foot", "bike"], "bike": ["foot"]}
         return courier_type in need_change.get(str(self.type_id), [])
 
     def get_not_delivered_orders(self):
-        orders = self.orders.filter(is_delivered=False).all()
+        orders = self.orders.filter(is_delivered=False).order_by("id")
         if orders:
             assign_time = orders[0].assign_time
             orders = [{"id": item.pk} for item in orders]
             return orders, assign_time
         return None, None
 
-    def assign_orders(self, weight, orders):
-        assign_time = now()
-        success = []
+    def eligible_orders(self, orders):
+        orders = list(orders)
+        if settings.API_SCHEDULE_SLOTS:
+            slots = self.stored_slots()
+            orders = [
+                order for order in orders if order.slots is None or order.slots & slots
+            ]
+        index = IntervalIndex(
+            (*period_minutes(delivery), key)
+            for key, order in enumerate(orders)
+            for delivery in order.delivery_hours.all()
+        )
+        visited = set()
+        eligible = []
 
         for work_time in self.working_hours.all():
-            for order in orders:
-                if weight == 0:
-                    break
+            for key in index.overlapping(*period_minutes(work_time)):
+                if key not in visited:
+                    visited.add(key)
+                    eligible.append(orders[key])
+        return eligible
 
-                if order.pk in success or order.weight > weight:
-                    continue
+    def assign_orders(self, weight, orders, strategy=None):
+        assign_time = now()
+        chosen = get_strategy(strategy)(self.eligible_orders(orders), weight)
+        success = sorted(order.id for order in chosen)
 
-                for delivery in order.delivery_hours.all():
-                    check_start_time = (
-                        work_time.time_from <= delivery.time_from < work_time.time_to
-                    )
-                    check_end_time = (
-                        work_time.time_from < delivery.time_to <= work_time.time_to
-                    )
-                    if check_start_time or check_end_time:
-                        order.courier_id = self.pk
-                        order.assign_time = assign_time
-                        order.save()
-                        success.append(order.id)
-                        weight -= order.weight
-                        break
-        success = sorted(success)
+        if success:
+            self.orders.model.objects.filter(id__in=success).assign(
+                self.pk, assign_time
+            )
         return [{"id": item} for item in success], assign_time
 
     def check_orders(self):
-        delivered = []
-        for order in self.orders.filter(is_delivered=False).all():
-            for work_time in self.working_hours.all():
-                for delivery in order.delivery_hours.all():
-                    check_start_time = (
-                        work_time.time_from <= delivery.time_from < work_time.time_to
-                    )
-                    check_end_time = (
-                        work_time.time_from < delivery.time_to <= work_time.time_to
-                    )
-                    if check_start_time or check_end_time:
-                        delivered.append(order.id)
-                        break
-
-            if order.pk not in delivered:
-                order.courier_id = None
-                order.assign_time = None
-                order.save()
+        return self.orders.release_unfit()
 
 
 class CourierRegion(models.Model):
@@ -136,6 +288,9 @@ class CourierRegion(models.Model):
     class Meta:
         verbose_name = "Регион курьера"
         verbose_name_plural = "Регионы курьера"
+        indexes = [
+            models.Index(fields=["courier", "region_id"], name="courier_region"),
+        ]
 
 
 class CourierWork(models.Model):
@@ -145,15 +300,52 @@ class CourierWork(models.Model):
     time_from = models.TimeField("Время с", null=True)
     time_to = models.TimeField("Время по", null=True)
 
+    objects = PeriodQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Время работы курьера"
         verbose_name_plural = "Периоды работы курьера"
 
     def __str__(self):
-        return f"{self.time_from.strftime('%H:%M')}-{self.time_to.strftime('%H:%M')}"
+        time_from, time_to = period_minutes(self)
+        return f"{format_minutes(time_from)}-{format_minutes(time_to)}"
 
     def time_to_str_dict(self):
+        time_from, time_to = period_minutes(self)
         return {
-            "time_from": self.time_from.strftime("%H:%M"),
-            "time_to": self.time_to.strftime("%H:%M"),
+            "time_from": format_minutes(time_from),
+            "time_to": format_minutes(time_to),
         }
+
+
+class CourierRating(models.Model):
+    courier = models.ForeignKey(
+        Courier, related_name="ratings", on_delete=models.CASCADE
+    )
+    region_id = models.IntegerField("Регион")
+    delivery_time = models.BigIntegerField("Суммарное время доставки", default=0)
+    delivery_count = models.IntegerField("Количество доставок", default=0)
+    last_complete_time = models.DateTimeField(
+        "Время последней доставки", blank=True, null=True
+    )
+    last_order_id = models.IntegerField("Последний заказ", blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Рейтинг курьера в регионе"
+        verbose_name_plural = "Рейтинги курьера в регионах"
+        unique_together = ("courier", "region_id")
+
+    def follows(self, order_id):
+        if not self.delivery_count:
+            return True
+        return self.last_order_id is not None and order_id > self.last_order_id
+
+    def add(self, order_id, assign_time, complete_time):
+        if self.delivery_count:
+            value = complete_time - self.last_complete_time
+        else:
+            value = complete_time - assign_time
+        self.delivery_time += value.seconds
+        self.delivery_count += 1
+        self.last_complete_time = complete_time
+        self.last_order_id = order_id
@@ -1,9 +1,142 @@
-from django.db import models
+from collections import defaultdict
 
-from api.models.courier import Courier
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, models
 
+from api.cache import courier_types
+from api.models.courier import (
+    Courier,
+    CourierWork,
+    PeriodQuerySet,
+    ScheduleSlots,
+    SlotsQuerySet,
+)
+from api.schedule import fitting_keys, format_minutes, period_minutes
+from api.strategies import knapsack
+
+
+class OrderQuerySet(SlotsQuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        OpenOrder.objects.bulk_create(
+            [
+                OpenOrder.from_order(order)
+                for order in objs
+                if order.pk is not None
+                and order.courier_id is None
+                and not order.is_delivered
+            ],
+            batch_size=kwargs.get("batch_size"),
+        )
+        return objs
+
+    def assign(self, courier_id, assign_time):
+        OpenOrder.objects.filter(order_id__in=self.values("id")).delete()
+        return self.update(courier_id=courier_id, assign_time=assign_time)
+
+    def assign_many(self, assignments, assign_time):
+        orders = []
+        for courier_id, courier_orders in assignments.items():
+            for order in courier_orders:
+                order.courier_id = courier_id
+                order.assign_time = assign_time
+                orders.append(order)
+        if orders:
+            OpenOrder.objects.filter(
+                order_id__in=[order.pk for order in orders]
+            ).delete()
+            self.model.objects.bulk_update(
+                orders,
+                ["courier", "assign_time"],
+                batch_size=settings.API_BULK_BATCH_SIZE,
+            )
+        return orders
+
+    def release(self, **kwargs):
+        values = dict(Courier.NULL_ORDER_DATA, **kwargs)
+        ids = []
+        orders = []
+        for pk, region, weight, is_delivered in self.values_list(
+            "id", "region", "weight", "is_delivered"
+        ):
+            ids.append(pk)
+            if not values.get("is_delivered", is_delivered):
+                orders.append(
+                    OpenOrder(
+                        order_id=pk,
+                        region=values.get("region", region),
+                        weight=values.get("weight", weight),
+                    )
+                )
+        if ids:
+            queryset = self.model.objects.filter(id__in=ids)
+            queryset.update(**values)
+            OpenOrder.objects.bulk_create(orders, ignore_conflicts=True)
+        return ids
+
+    def release_unfit(self):
+        orders = self.filter(courier_id__isnull=False, is_delivered=False)
+        order_couriers = dict(orders.values_list("id", "courier_id"))
+
+        periods = defaultdict(list)
+        working_hours = (
+            CourierWork.objects.filter(courier_id__in=orders.values("courier_id"))
+            .with_minutes()
+            .values_list("courier_id", "minute_from", "minute_to")
+        )
+        for courier_id, time_from, time_to in working_hours:
+            periods[courier_id].append((time_from, time_to))
+
+        intervals = defaultdict(list)
+        delivery_hours = (
+            OrderDelivery.objects.filter(order__in=orders)
+            .with_minutes()
+            .values_list("order_id", "minute_from", "minute_to")
+        )
+        for order_id, time_from, time_to in delivery_hours:
+            intervals[order_couriers[order_id]].append((time_from, time_to, order_id))
+
+        fitting = set()
+        for courier_id, courier_intervals in intervals.items():
+            fitting.update(fitting_keys(courier_intervals, periods[courier_id]))
+
+        released = [pk for pk in order_couriers if pk not in fitting]
+        if released:
+            self.model.objects.filter(id__in=released).release()
+        return released
+
+    def release_over_capacity(self, capacities=None):
+        orders = self.filter(courier_id__isnull=False, is_delivered=False).order_by(
+            "courier_id", "id"
+        )
+        if capacities is None:
+            types = courier_types.all()
+            capacities = {
+                courier_id: types[type_id].weight
+                for courier_id, type_id in Courier.objects.filter(
+                    id__in=orders.values("courier_id"), type_id__isnull=False
+                ).values_list("id", "type_id")
+            }
+
+        courier_orders = defaultdict(list)
+        for order in orders.only("id", "courier_id", "weight"):
+            courier_orders[order.courier_id].append(order)
+
+        released = []
+        for courier_id, assigned in courier_orders.items():
+            capacity = capacities.get(courier_id) or 0
+            kept = {order.pk for order in knapsack(assigned, capacity)}
+            released += [order.pk for order in assigned if order.pk not in kept]
+        if released:
+            self.model.objects.filter(id__in=released).release()
+        return released
+
+
+class Order(ScheduleSlots):
+    BASE_PRICE = 500
+
+    schedule_field = "delivery_hours"
 
-class Order(models.Model):
     region = models.IntegerField("Регион")
     weight = models.DecimalField("Вес", max_digits=5, decimal_places=2)
 
@@ -22,9 +155,71 @@ class Order(models.Model):
     assign_time = models.DateTimeField("Время назначение", blank=True, null=True)
     complete_time = models.DateTimeField("Время завершение", blank=True, null=True)
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Заказ"
         verbose_name_plural = "Заказы"
+        indexes = [
+            models.Index(
+                fields=["courier", "region", "weight"],
+                name="order_courier_region_weight",
+            ),
+            models.Index(
+                fields=["courier", "is_delivered", "region"],
+                name="order_courier_delivered_region",
+            ),
+        ]
+
+
+class OpenOrder(models.Model):
+    """Unassigned order, kept apart from the delivered history."""
+
+    order = models.OneToOneField(
+        Order,
+        primary_key=True,
+        related_name="open_order",
+        on_delete=models.CASCADE,
+        verbose_name="Заказ",
+    )
+    region = models.IntegerField("Регион")
+    weight = models.DecimalField("Вес", max_digits=5, decimal_places=2)
+
+    class Meta:
+        verbose_name = "Открытый заказ"
+        verbose_name_plural = "Открытые заказы"
+        indexes = [
+            models.Index(fields=["region", "weight"], name="open_order_region_weight"),
+        ]
+
+    @classmethod
+    def from_order(cls, order):
+        return cls(order_id=order.pk, region=order.region, weight=order.weight)
+
+    @classmethod
+    def sync(cls, instance, **kwargs):
+        if instance.courier_id is None and not instance.is_delivered:
+            cls.objects.update_or_create(
+                order_id=instance.pk,
+                defaults={"region": instance.region, "weight": instance.weight},
+            )
+        else:
+            cls.objects.filter(order_id=instance.pk).delete()
+
+    @classmethod
+    def release_courier(cls, instance, **kwargs):
+        Order.objects.filter(courier_id=instance.pk, is_delivered=False).release()
+
+    @classmethod
+    def backfill(cls, using=DEFAULT_DB_ALIAS, **kwargs):
+        orders = Order.objects.using(using).filter(
+            courier_id__isnull=True, is_delivered=False, open_order__isnull=True
+        )
+        cls.objects.using(using).bulk_create(
+            (cls.from_order(order) for order in orders.iterator()),
+            batch_size=settings.API_BULK_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
 
 
 class OrderDelivery(models.Model):
@@ -37,6 +232,50 @@ class OrderDelivery(models.Model):
     time_from = models.TimeField("Время с", null=True)
     time_to = models.TimeField("Время по", null=True)
 
+    objects = PeriodQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Время доставки заказа"
         verbose_name_plural = "Периоды доставки заказа"
+
+
+class ArchivedOrder(models.Model):
+    """Delivered order moved out of the hot tables by ``archive_orders``."""
+
+    id = models.IntegerField(primary_key=True)
+    courier = models.ForeignKey(
+        Courier,
+        on_delete=models.SET_NULL,
+        related_name="archived_orders",
+        verbose_name="Курьер",
+        blank=True,
+        null=True,
+    )
+    region = models.IntegerField("Регион")
+    weight = models.DecimalField("Вес", max_digits=5, decimal_places=2)
+    courier_price = models.DecimalField(
+        "Оплата курьеру", default=0.00, max_digits=7, decimal_places=2
+    )
+    assign_time = models.DateTimeField("Время назначение", blank=True, null=True)
+    complete_time = models.DateTimeField("Время завершение", blank=True, null=True)
+    delivery_hours = models.JSONField("Периоды доставки", default=list)
+
+    class Meta:
+        verbose_name = "Архивный заказ"
+        verbose_name_plural = "Архивные заказы"
+
+    @classmethod
+    def from_order(cls, order):
+        return cls(
+            id=order.pk,
+            courier_id=order.courier_id,
+            region=order.region,
+            weight=order.weight,
+            courier_price=order.courier_price,
+            assign_time=order.assign_time,
+            complete_time=order.complete_time,
+            delivery_hours=[
+                "-".join(map(format_minutes, period_minutes(delivery)))
+                for delivery in order.delivery_hours.all()
+            ],
+        )
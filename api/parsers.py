@@ -0,0 +1,108 @@
+import codecs
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class JSONItemStream:
+    """Lazily yields the items of ``[...]`` or ``{"data": [...]}`` from a stream."""
+
+    whitespace = " \t\n\r"
+
+    def __init__(self, stream, encoding, chunk_size):
+        self.stream = stream
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.json = json.JSONDecoder()
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.items = self.parse()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.items)
+
+    def read(self, size=0):
+        if self.eof:
+            return False
+        size = max(size, self.chunk_size)
+        chunk = self.stream.read(size) if self.stream else b""
+        self.buffer = self.buffer[self.pos :] + self.decoder.decode(chunk, not chunk)
+        self.pos = 0
+        self.eof = not chunk
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer):
+                if self.buffer[self.pos] not in self.whitespace:
+                    return self.buffer[self.pos]
+                self.pos += 1
+            if not self.read():
+                return ""
+
+    def expect(self, chars):
+        char = self.peek()
+        if char == "" or char not in chars:
+            raise ParseError("JSON parse error - expected one of %r" % chars)
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next value, a number only once something follows it."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.json.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as exc:
+                if not self.read(len(self.buffer) - self.pos):
+                    raise ParseError("JSON parse error - %s" % exc)
+                continue
+            if end < len(self.buffer) or not self.read():
+                self.pos = end
+                return value
+
+    def parse(self):
+        envelope = self.expect("[{") == "{"
+        if envelope:
+            while True:
+                if self.peek() == "}":
+                    raise ParseError('JSON parse error - "data" key is missing')
+                key = self.value()
+                self.expect(":")
+                if key == "data":
+                    self.expect("[")
+                    break
+                self.value()
+                if self.expect(",}") == "}":
+                    raise ParseError('JSON parse error - "data" key is missing')
+
+        if self.peek() == "]":
+            self.pos += 1
+        else:
+            while True:
+                yield self.value()
+                if self.expect(",]") == "]":
+                    break
+
+        if envelope:
+            while self.expect(",}") == ",":
+                self.value()
+                self.expect(":")
+                self.value()
+        if self.peek() != "":
+            raise ParseError("JSON parse error - extra data after the payload")
+
+
+class StreamingJSONParser(BaseParser):
+    media_type = "application/json"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        return JSONItemStream(stream, encoding, settings.API_STREAMING_CHUNK_SIZE)
@@ -0,0 +1,86 @@
+import re
+from bisect import bisect_left, bisect_right
+
+TIME_PATTERN = re.compile(r"(2[0-3]|[0-1]\d|\d):([0-5]\d|\d)")
+MINUTE_LABELS = [f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(24 * 60)]
+SLOT_MINUTES = 15
+HALF_SLOTS = 24 * 60 // SLOT_MINUTES // 2
+HALF_MASK = (1 << HALF_SLOTS) - 1
+
+
+def minute_of_day(value):
+    return value.hour * 60 + value.minute
+
+
+def parse_minutes(value):
+    match = TIME_PATTERN.fullmatch(value)
+    if match is None:
+        raise ValueError(f"time data {value!r} does not match format '%H:%M'")
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+
+def format_minutes(value):
+    return MINUTE_LABELS[value]
+
+
+def period_minutes(period):
+    try:
+        return period.minute_from, period.minute_to
+    except AttributeError:
+        return minute_of_day(period.time_from), minute_of_day(period.time_to)
+
+
+def period_slots(time_from, time_to):
+    """Bitmap of the 15-minute slots a period touches, ends included."""
+    first, last = sorted((time_from // SLOT_MINUTES, time_to // SLOT_MINUTES))
+    return ((1 << (last - first + 1)) - 1) << first
+
+
+def schedule_slots(periods):
+    slots = 0
+    for time_from, time_to in periods:
+        slots |= period_slots(time_from, time_to)
+    return slots
+
+
+def split_slots(slots):
+    return slots & HALF_MASK, slots >> HALF_SLOTS
+
+
+def join_slots(slots_am, slots_pm):
+    return slots_am | slots_pm << HALF_SLOTS
+
+
+class IntervalIndex:
+    """Intervals that start in [from, to) or end in (from, to]."""
+
+    def __init__(self, intervals):
+        starts = []
+        ends = []
+        for start, end, key in intervals:
+            starts.append((start, key))
+            ends.append((end, key))
+        starts.sort()
+        ends.sort()
+        self.start_values = [value for value, key in starts]
+        self.start_keys = [key for value, key in starts]
+        self.end_values = [value for value, key in ends]
+        self.end_keys = [key for value, key in ends]
+
+    def overlapping(self, time_from, time_to):
+        start_from = bisect_left(self.start_values, time_from)
+        start_to = bisect_left(self.start_values, time_to)
+        end_from = bisect_right(self.end_values, time_from)
+        end_to = bisect_right(self.end_values, time_to)
+
+        keys = set(self.start_keys[start_from:start_to])
+        keys.update(self.end_keys[end_from:end_to])
+        return sorted(keys)
+
+
+def fitting_keys(intervals, periods):
+    index = IntervalIndex(intervals)
+    keys = set()
+    for time_from, time_to in periods:
+        keys.update(index.overlapping(time_from, time_to))
+    return keys
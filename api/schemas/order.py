@@ -1,6 +1,11 @@
 from drf_yasg import openapi
 from rest_framework import serializers
 
+from api.strategies import STRATEGIES
+
+ASSIGN_STRATEGY = list(STRATEGIES)
+COMPLETE_STATUS = ["completed", "already_completed", "not_found", "invalid"]
+
 
 class OrdersIdSchema(serializers.Serializer):
     id = serializers.IntegerField(label="Уникальный идентификатор курьера")
@@ -43,6 +48,9 @@ class AssignTime(serializers.Serializer):
 
 class OrdersAssignPostRequest(serializers.Serializer):
     courier_id = serializers.IntegerField(label="Уникальный идентификатор курьера")
+    strategy = serializers.ChoiceField(
+        label="Стратегия назначения", choices=ASSIGN_STRATEGY, required=False
+    )
 
 
 class OrdersAssignPostResponse(serializers.Serializer):
@@ -52,6 +60,20 @@ class OrdersAssignPostResponse(serializers.Serializer):
     )
 
 
+class OrdersAssignFleetRequest(serializers.Serializer):
+    courier_ids = serializers.ListField(
+        label="Идентификаторы курьеров", child=serializers.IntegerField()
+    )
+
+
+class CourierAssignment(OrdersAssignPostResponse):
+    courier_id = serializers.IntegerField(label="Уникальный идентификатор курьера")
+
+
+class OrdersAssignFleetResponse(serializers.Serializer):
+    couriers = CourierAssignment(many=True)
+
+
 class OrdersCompletePostRequest(serializers.Serializer):
     courier_id = serializers.IntegerField(label="Уникальный идентификатор курьера")
 
@@ -69,7 +91,35 @@ ASSIGN_ORDER_RESPONSE = {
     "400": openapi.Response(description="Bad request"),
 }
 
+ASSIGN_FLEET_RESPONSE = {
+    "200": openapi.Response(description="OK", schema=OrdersAssignFleetResponse()),
+    "400": openapi.Response(description="Bad request"),
+}
+
 COMPLETE_ORDER_RESPONSE = {
     "200": openapi.Response(description="OK", schema=OrdersCompletePostResponse()),
     "400": openapi.Response(description="Bad request"),
 }
+
+
+class OrdersCompleteItem(serializers.Serializer):
+    courier_id = serializers.IntegerField(label="Уникальный идентификатор курьера")
+    order_id = serializers.IntegerField(label="Уникальный идентификатор заказа")
+    complete_time = serializers.DateTimeField(
+        label="Время доставки", format="%Y-%m-%dT%H:%M:%SZ"
+    )
+
+
+class OrdersCompleteResult(serializers.Serializer):
+    order_id = serializers.IntegerField(label="Уникальный идентификатор заказа")
+    status = serializers.ChoiceField(label="Результат", choices=COMPLETE_STATUS)
+
+
+class OrdersCompleteBatchResponse(serializers.Serializer):
+    orders = OrdersCompleteResult(many=True)
+
+
+COMPLETE_BATCH_RESPONSE = {
+    "200": openapi.Response(description="OK", schema=OrdersCompleteBatchResponse()),
+    "400": openapi.Response(description="Bad request"),
+}
@@ -1,33 +1,56 @@
-from datetime import datetime
-
+from django.conf import settings
 from django.db import transaction
-from django.db.models import Sum
+from django.db.models import Prefetch
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from api.cache import courier_cache, courier_types
 from api.models.courier import Courier, CourierType, CourierWork, CourierRegion
-from api.models.order import Order
+from api.models.order import Order, OrderDelivery
+from api.schedule import (
+    fitting_keys,
+    format_minutes,
+    parse_minutes,
+    period_minutes,
+    schedule_slots,
+    split_slots,
+)
+from api.strategies import knapsack
+
+
+def parse_working_hours(data):
+    periods = data.split("-")
+    if len(periods) < 2:
+        raise ValidationError()
+    try:
+        time1 = parse_minutes(periods[0])
+        time2 = parse_minutes(periods[1])
+
+        if time1 > time2:
+            raise ValidationError()
+    except ValueError:
+        raise ValidationError()
+    return {"time_from": periods[0], "time_to": periods[1]}
+
+
+def format_working_hours(value):
+    time_from, time_to = period_minutes(value)
+    return f"{format_minutes(time_from)}-{format_minutes(time_to)}"
 
 
 class WorkingHoursField(serializers.CharField):
     def to_representation(self, value):
-        time_to = value.time_to.strftime("%H:%M")
-        time_from = value.time_from.strftime("%H:%M")
-        return f"{time_from}-{time_to}"
+        return format_working_hours(value)
 
     def to_internal_value(self, data):
-        periods = data.split("-")
-        if len(periods) < 2:
-            raise ValidationError()
-        try:
-            time1 = datetime.strptime(periods[0], "%H:%M")
-            time2 = datetime.strptime(periods[1], "%H:%M")
+        return parse_working_hours(data)
 
-            if time1 > time2:
-                raise ValidationError()
-        except ValueError:
-            raise ValidationError()
-        return {"time_from": periods[0], "time_to": periods[1]}
+
+def hours_periods(working_hours):
+    return [
+        (parse_minutes(each["time_from"]), parse_minutes(each["time_to"]))
+        for each in working_hours
+    ]
 
 
 class RegionField(serializers.IntegerField):
@@ -35,47 +58,95 @@ class RegionField(serializers.IntegerField):
         return value.region_id
 
 
+class CourierTypeField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        try:
+            courier_type = courier_types.get(data)
+        except TypeError:
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if courier_type is None:
+            self.fail("does_not_exist", pk_value=data)
+        return courier_type
+
+
+def create_couriers(validated_data):
+    couriers = []
+    regions = []
+    working_hours = []
+    for item in validated_data:
+        regions_data = item.pop("regions", [])
+        working_hours_data = item.pop("working_hours", [])
+        courier = Courier(**item)
+        courier.set_slots(schedule_slots(hours_periods(working_hours_data)))
+        couriers.append(courier)
+        regions += [
+            CourierRegion(courier_id=courier.pk, region_id=each)
+            for each in regions_data
+        ]
+        working_hours += [
+            CourierWork(courier_id=courier.pk, **each) for each in working_hours_data
+        ]
+
+    batch_size = settings.API_BULK_BATCH_SIZE
+    with transaction.atomic():
+        Courier.objects.bulk_create(couriers, batch_size=batch_size)
+        CourierRegion.objects.bulk_create(regions, batch_size=batch_size)
+        CourierWork.objects.bulk_create(working_hours, batch_size=batch_size)
+
+    return couriers
+
+
+def create_courier(validated_data):
+    regions_data = validated_data.pop("regions", None)
+    working_hours_data = validated_data.pop("working_hours", [])
+    slots = schedule_slots(hours_periods(working_hours_data))
+    validated_data["slots_am"], validated_data["slots_pm"] = split_slots(slots)
+
+    with transaction.atomic():
+        courier = Courier.objects.create(**validated_data)
+
+        for each in regions_data:
+            CourierRegion.objects.create(
+                **{"region_id": each, "courier_id": courier.pk}
+            )
+
+        for each in working_hours_data:
+            each["courier_id"] = courier.pk
+            CourierWork.objects.create(**each)
+
+    return courier
+
+
+class CourierListSerializer(serializers.ListSerializer):
+    def create(self, validated_data):
+        return create_couriers(validated_data)
+
+
 class CourierSerializer(serializers.ModelSerializer):
     courier_id = serializers.IntegerField(source="id")
-    courier_type = serializers.PrimaryKeyRelatedField(
-        queryset=CourierType.objects.all(), source="type"
-    )
+    courier_type = CourierTypeField(queryset=CourierType.objects.all(), source="type")
     regions = serializers.ListSerializer(child=serializers.IntegerField())
     working_hours = serializers.ListSerializer(child=WorkingHoursField())
 
     class Meta:
         model = Courier
         fields = ("courier_id", "courier_type", "regions", "working_hours")
+        list_serializer_class = CourierListSerializer
 
-    def validate(self, data):
-        if hasattr(self, "initial_data"):
-            unknown_keys = set(self.initial_data.keys()) - set(self.fields.keys())
+    def to_internal_value(self, data):
+        if isinstance(data, dict):
+            unknown_keys = set(data.keys()) - set(self.fields.keys())
             if unknown_keys:
                 raise ValidationError()
-        return data
+        return super().to_internal_value(data)
 
     def create(self, validated_data):
-        regions_data = validated_data.pop("regions", None)
-        working_hours_data = validated_data.pop("working_hours", [])
-
-        with transaction.atomic():
-            courier = self.Meta.model.objects.create(**validated_data)
-
-            for each in regions_data:
-                CourierRegion.objects.create(
-                    **{"region_id": each, "courier_id": courier.pk}
-                )
-
-            for each in working_hours_data:
-                each["courier_id"] = courier.pk
-                CourierWork.objects.create(**each)
-
-        return courier
+        return create_courier(validated_data)
 
 
 class CourierUpdateSerializer(serializers.ModelSerializer):
     courier_id = serializers.IntegerField(source="id", required=False)
-    courier_type = serializers.PrimaryKeyRelatedField(
+    courier_type = CourierTypeField(
         queryset=CourierType.objects.all(), source="type", required=False
     )
     regions = serializers.ListSerializer(child=RegionField(), required=False)
@@ -103,73 +174,89 @@ class CourierUpdateSerializer(serializers.ModelSerializer):
         return data
 
     def update(self, instance, validated_data):
-        region_ids = instance.regions_id
-        regions_data = validated_data.pop("regions", region_ids)
-
-        courier_type = instance.type
-        type_data = validated_data.pop("type", courier_type)
-
-        working_hours = instance.list_hours
-        working_hours_data = validated_data.pop("working_hours", working_hours)
+        with transaction.atomic():
+            if settings.API_ASSIGN_LOCKING:
+                courier = self.Meta.model.objects.select_for_update().get(
+                    pk=instance.pk
+                )
+                instance.type_id = courier.type_id
+            regions = list(instance.regions.all())
+            working_hours = list(instance.working_hours.all())
+            orders = list(
+                instance.orders.filter(is_delivered=False)
+                .order_by("id")
+                .prefetch_related(
+                    Prefetch(
+                        "delivery_hours",
+                        queryset=OrderDelivery.objects.with_minutes().only("order"),
+                    )
+                )
+            )
+            released = set()
+            changes = {}
 
-        if regions_data != region_ids:
+            region_ids = [region.region_id for region in regions]
+            regions_data = validated_data.get("regions", region_ids)
             region_add = set(regions_data) - set(region_ids)
-            region_delete = list(set(region_ids) - set(regions_data))
+            region_delete = set(region_ids) - set(regions_data)
             if region_add:
-                regions = [
-                    CourierRegion(courier=instance, region_id=param)
-                    for param in region_add
-                ]
-                CourierRegion.objects.bulk_create(regions)
+                CourierRegion.objects.bulk_create(
+                    [
+                        CourierRegion(courier_id=instance.pk, region_id=region)
+                        for region in region_add
+                    ]
+                )
             if region_delete:
-                Order.objects.filter(
-                    courier_id=instance.pk, is_delivered=False, region__in=region_delete
-                ).update(**instance.NULL_ORDER_DATA)
                 CourierRegion.objects.filter(
                     courier_id=instance.pk, region_id__in=region_delete
                 ).delete()
-            instance.refresh_from_db()
-
-        if type_data != courier_type and instance.need_change_order_weight(
-            type_data.pk
-        ):
-            weight = CourierType.objects.filter(id=type_data.pk).first().weight
-            for order in instance.orders.filter(is_delivered=False).all():
-                if order.weight > weight:
-                    order.courier_id = None
-                    order.assign_time = None
-                    order.save()
-                else:
-                    weight -= order.weight
-            instance.refresh_from_db()
-        if type_data != courier_type:
-            instance.type = type_data
-            instance.save()
-
-        if working_hours_data != working_hours:
-            hours_add = [x for x in working_hours_data if x not in working_hours]
-            hours_delete = [x for x in working_hours if x not in working_hours_data]
-
-            if working_hours_data == list():
-                Order.objects.filter(courier_id=instance.pk, is_delivered=False).update(
-                    **instance.NULL_ORDER_DATA
+                released.update(
+                    order.pk for order in orders if order.region in region_delete
+                )
+
+            type_data = validated_data.get("type")
+            if type_data is not None and type_data.pk != instance.type_id:
+                if instance.need_change_order_weight(type_data.pk):
+                    assigned = [order for order in orders if order.pk not in released]
+                    kept = {order.pk for order in knapsack(assigned, type_data.weight)}
+                    released.update(
+                        order.pk for order in assigned if order.pk not in kept
+                    )
+                changes["type"] = type_data
+                instance.type = type_data
+
+            hours = [work_time.time_to_str_dict() for work_time in working_hours]
+            hours_data = validated_data.get("working_hours", hours)
+            hours_add = [each for each in hours_data if each not in hours]
+            hours_delete = [
+                work_time.pk
+                for work_time, each in zip(working_hours, hours)
+                if each not in hours_data
+            ]
+            if hours_delete:
+                CourierWork.objects.filter(id__in=hours_delete).delete()
+            if hours_add:
+                CourierWork.objects.bulk_create(
+                    [CourierWork(courier_id=instance.pk, **each) for each in hours_add]
                 )
-                CourierWork.objects.filter(courier_id=instance.pk).delete()
-            else:
-                if hours_delete:
-                    for work_time in hours_delete:
-                        CourierWork.objects.filter(
-                            courier_id=instance.pk,
-                            time_from=work_time.get("time_from"),
-                            time_to=work_time.get("time_to"),
-                        ).delete()
-                if hours_add:
-                    for each in hours_add:
-                        each["courier_id"] = instance.pk
-                        CourierWork.objects.create(**each)
-
-        instance.check_orders()
-        instance.refresh_from_db()
+
+            periods = hours_periods(hours_data)
+            if hours_add or hours_delete:
+                instance.set_slots(schedule_slots(periods))
+                changes.update(slots_am=instance.slots_am, slots_pm=instance.slots_pm)
+            if changes:
+                self.Meta.model.objects.filter(pk=instance.pk).update(**changes)
+            intervals = [
+                (*period_minutes(delivery), order.pk)
+                for order in orders
+                for delivery in order.delivery_hours.all()
+            ]
+            fitting = fitting_keys(intervals, periods)
+            released.update(order.pk for order in orders if order.pk not in fitting)
+            if released:
+                Order.objects.filter(id__in=released).release()
+
+        courier_cache.invalidate(instance.pk)
         return instance
 
 
@@ -184,10 +271,9 @@ class CourierRetrieveSerializer(serializers.ModelSerializer):
     earnings = serializers.SerializerMethodField(method_name="get_earnings")
 
     def get_earnings(self, obj):
-        sum = obj.orders.filter(is_delivered=True).aggregate(Sum("courier_price"))[
-            "courier_price__sum"
-        ]
-        return sum if sum else 0
+        if obj.summary_ready:
+            return obj.earnings if obj.earnings else 0
+        return obj.collect_earnings()
 
     class Meta:
         model = Courier
@@ -0,0 +1,268 @@
+import re
+from collections.abc import Mapping
+from functools import lru_cache
+
+from rest_framework import serializers
+from rest_framework.exceptions import ErrorDetail, ValidationError
+from rest_framework.fields import empty
+from rest_framework.settings import api_settings
+
+from api.cache import courier_types
+from api.models.courier import Courier
+from api.models.order import Order
+from api.serializers.courier import (
+    create_courier,
+    create_couriers,
+    format_working_hours,
+    parse_working_hours,
+)
+from api.serializers.order import (
+    OrdersSerializer,
+    archived_order_ids,
+    create_order,
+    create_orders,
+    parse_delivery_hours,
+)
+
+RE_DECIMAL = re.compile(r"\.0*\s*$")
+
+
+def fail(field_class, key, **kwargs):
+    for cls in field_class.__mro__:
+        messages = cls.__dict__.get("default_error_messages", {})
+        if key in messages:
+            return ValidationError(messages[key].format(**kwargs), code=key)
+    raise KeyError(key)
+
+
+def non_field_error(field_class, key, **kwargs):
+    message = field_class.default_error_messages[key].format(**kwargs)
+    return ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code=key)
+
+
+def check_empty(field_class, data):
+    if data is empty:
+        raise fail(field_class, "required")
+    if data is None:
+        raise fail(field_class, "null")
+
+
+def to_integer(data):
+    if type(data) is int:
+        return data
+    check_empty(serializers.IntegerField, data)
+    if isinstance(data, str) and len(data) > serializers.IntegerField.MAX_STRING_LENGTH:
+        raise fail(serializers.IntegerField, "max_string_length")
+    try:
+        return int(RE_DECIMAL.sub("", str(data)))
+    except (ValueError, TypeError):
+        raise fail(serializers.IntegerField, "invalid")
+
+
+def to_list(data, child):
+    check_empty(serializers.ListSerializer, data)
+    if not isinstance(data, list):
+        raise non_field_error(
+            serializers.ListSerializer, "not_a_list", input_type=type(data).__name__
+        )
+
+    values = []
+    errors = []
+    for item in data:
+        try:
+            values.append(child(item))
+        except ValidationError as exc:
+            errors.append(exc.detail)
+        else:
+            errors.append({})
+    if any(errors):
+        raise ValidationError(errors)
+    return values
+
+
+def to_hours(parse):
+    def validate(data):
+        if data == "" or str(data).strip() == "":
+            raise fail(serializers.CharField, "blank")
+        check_empty(serializers.CharField, data)
+        return parse(data)
+
+    return validate
+
+
+to_working_hours = to_hours(parse_working_hours)
+to_delivery_hours = to_hours(parse_delivery_hours)
+
+
+def to_courier_type(data):
+    if data == "":
+        data = None
+    check_empty(serializers.PrimaryKeyRelatedField, data)
+    try:
+        courier_type = courier_types.get(data)
+    except TypeError:
+        raise fail(
+            serializers.PrimaryKeyRelatedField,
+            "incorrect_type",
+            data_type=type(data).__name__,
+        )
+    if courier_type is None:
+        raise fail(serializers.PrimaryKeyRelatedField, "does_not_exist", pk_value=data)
+    return courier_type
+
+
+@lru_cache(maxsize=None)
+def get_weight_field():
+    return OrdersSerializer().fields["weight"]
+
+
+def to_weight(data):
+    return get_weight_field().run_validation(data)
+
+
+def validate_item(fields, data):
+    """``Serializer.run_validation`` of one item of an import payload."""
+    if data is None:
+        raise fail(serializers.Serializer, "null")
+    if isinstance(data, dict) and not set(data.keys()) <= fields.keys():
+        raise ValidationError()
+    if not isinstance(data, Mapping):
+        raise non_field_error(
+            serializers.Serializer, "invalid", datatype=type(data).__name__
+        )
+
+    value = {}
+    errors = {}
+    for name, (source, validate) in fields.items():
+        try:
+            value[source] = validate(data.get(name, empty))
+        except ValidationError as exc:
+            errors[name] = exc.detail
+    if errors:
+        raise ValidationError(errors)
+    return value
+
+
+COURIER_FIELDS = {
+    "courier_id": ("id", to_integer),
+    "courier_type": ("type", to_courier_type),
+    "regions": ("regions", lambda data: to_list(data, to_integer)),
+    "working_hours": ("working_hours", lambda data: to_list(data, to_working_hours)),
+}
+
+
+def to_order_id(data, archived_ids):
+    value = to_integer(data)
+    if value in archived_ids:
+        raise ValidationError()
+    return value
+
+
+ORDER_FIELDS = {
+    "order_id": ("id", to_integer),
+    "weight": ("weight", to_weight),
+    "region": ("region", to_integer),
+    "delivery_hours": (
+        "delivery_hours",
+        lambda data: to_list(data, to_delivery_hours),
+    ),
+}
+
+
+class FastImportSerializer:
+    """The part of the DRF import serializers used by the views."""
+
+    fields = None
+    create_one = None
+    create_many = None
+
+    def __init__(self, data, many=False, context=None):
+        self.initial_data = data
+        self.many = many
+
+    def get_fields(self, data):
+        return self.fields
+
+    def validate(self, data):
+        fields = self.get_fields(data)
+        if not self.many:
+            return validate_item(fields, data)
+        check_empty(serializers.ListSerializer, data)
+        return to_list(data, lambda item: validate_item(fields, item))
+
+    def is_valid(self):
+        try:
+            self.validated_data = self.validate(self.initial_data)
+        except ValidationError as exc:
+            self.validated_data = [] if self.many else {}
+            self._errors = exc.detail
+        else:
+            self._errors = [] if self.many else {}
+        return not self._errors
+
+    @property
+    def errors(self):
+        errors = self._errors
+        if (
+            isinstance(errors, list)
+            and len(errors) == 1
+            and getattr(errors[0], "code", None) == "null"
+        ):
+            detail = ErrorDetail("No data provided", code="null")
+            return {api_settings.NON_FIELD_ERRORS_KEY: [detail]}
+        return errors
+
+    def save(self):
+        if self.many:
+            validated_data = [dict(item) for item in self.validated_data]
+            self.instance = self.create_many(validated_data)
+        else:
+            self.instance = self.create_one(dict(self.validated_data))
+        return self.instance
+
+
+class FastCourierSerializer(FastImportSerializer):
+    fields = COURIER_FIELDS
+    create_one = staticmethod(create_courier)
+    create_many = staticmethod(create_couriers)
+
+    class Meta:
+        model = Courier
+
+
+class FastOrdersSerializer(FastImportSerializer):
+    fields = ORDER_FIELDS
+    create_one = staticmethod(create_order)
+    create_many = staticmethod(create_orders)
+
+    def get_fields(self, data):
+        items = data if self.many and isinstance(data, list) else [data]
+        archived_ids = archived_order_ids(
+            item.get("order_id") for item in items if isinstance(item, dict)
+        )
+        return dict(
+            self.fields, order_id=("id", lambda value: to_order_id(value, archived_ids))
+        )
+
+    class Meta:
+        model = Order
+
+
+def courier_representation(courier):
+    """``CourierRetrieveSerializer(courier).data`` as a plain dict."""
+    rating = courier.rating
+    if courier.summary_ready:
+        earnings = courier.earnings if courier.earnings else 0
+    else:
+        earnings = courier.collect_earnings()
+    data = {
+        "courier_id": int(courier.id),
+        "courier_type": courier.type_id,
+        "regions": [region.region_id for region in courier.regions.all()],
+        "working_hours": [
+            format_working_hours(work_time) for work_time in courier.working_hours.all()
+        ],
+        "rating": None if rating is None else float(rating),
+        "earnings": earnings,
+    }
+    return {key: value for key, value in data.items() if value is not None}
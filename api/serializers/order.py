@@ -1,19 +1,101 @@
+from django.conf import settings
 from django.db import transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
-from api.models.order import Order, OrderDelivery
+from api.models.order import ArchivedOrder, Order, OrderDelivery
+from api.schedule import (
+    format_minutes,
+    parse_minutes,
+    period_minutes,
+    schedule_slots,
+    split_slots,
+)
+
+
+def delivery_slots(delivery_hours):
+    return schedule_slots(
+        (parse_minutes(each.time_from), parse_minutes(each.time_to))
+        for each in delivery_hours
+    )
+
+
+def parse_delivery_hours(data):
+    periods = data.split("-")
+    if len(periods) < 2:
+        raise ValidationError()
+    try:
+        parse_minutes(periods[0])
+        parse_minutes(periods[1])
+    except ValueError:
+        raise ValidationError()
+    return OrderDelivery(time_from=periods[0], time_to=periods[1])
+
+
+def archived_order_ids(ids):
+    keys = []
+    for pk in ids:
+        try:
+            keys.append(int(pk))
+        except (TypeError, ValueError):
+            pass
+    return set(ArchivedOrder.objects.filter(id__in=keys).values_list("id", flat=True))
 
 
 class DeliveryHoursField(serializers.CharField):
     def to_representation(self, value):
-        time_to = value.time_to.strftime("%H:%M")
-        time_from = value.time_from.strftime("%H:%M")
-        return f"{time_to}-{time_from}"
+        time_from, time_to = period_minutes(value)
+        return f"{format_minutes(time_to)}-{format_minutes(time_from)}"
 
     def to_internal_value(self, data):
-        periods = data.split("-")
-        return OrderDelivery(time_from=periods[0], time_to=periods[1])
+        return parse_delivery_hours(data)
+
+
+def create_orders(validated_data):
+    orders = []
+    delivery_hours = []
+    for item in validated_data:
+        delivery_hours_data = item.pop("delivery_hours", [])
+        order = Order(**item)
+        order.set_slots(delivery_slots(delivery_hours_data))
+        orders.append(order)
+        for each in delivery_hours_data:
+            each.order_id = order.pk
+            delivery_hours.append(each)
+
+    batch_size = settings.API_BULK_BATCH_SIZE
+    with transaction.atomic():
+        Order.objects.bulk_create(orders, batch_size=batch_size)
+        OrderDelivery.objects.bulk_create(delivery_hours, batch_size=batch_size)
+
+    return orders
+
+
+def create_order(validated_data):
+    delivery_hours_data = validated_data.pop("delivery_hours", [])
+    slots = delivery_slots(delivery_hours_data)
+    validated_data["slots_am"], validated_data["slots_pm"] = split_slots(slots)
+
+    with transaction.atomic():
+        order = Order.objects.create(**validated_data)
+
+        for each in delivery_hours_data:
+            each.order = order
+            each.save()
+
+    return order
+
+
+class OrdersListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.archived_ids = archived_order_ids(
+                item.get("order_id") for item in data if isinstance(item, dict)
+            )
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        return create_orders(validated_data)
 
 
 class OrdersSerializer(serializers.ModelSerializer):
@@ -24,22 +106,28 @@ class OrdersSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ("order_id", "weight", "region", "delivery_hours")
+        list_serializer_class = OrdersListSerializer
 
-    def validate(self, data):
-        if hasattr(self, "initial_data"):
-            unknown_keys = set(self.initial_data.keys()) - set(self.fields.keys())
+    def to_internal_value(self, data):
+        if isinstance(data, dict):
+            unknown_keys = set(data.keys()) - set(self.fields.keys())
             if unknown_keys:
                 raise ValidationError()
-        return data
+        return super().to_internal_value(data)
 
-    def create(self, validated_data):
-        delivery_hours_data = validated_data.pop("delivery_hours", [])
+    def validate_order_id(self, value):
+        archived_ids = getattr(self.parent, "archived_ids", None)
+        if archived_ids is None:
+            archived_ids = archived_order_ids([value])
+        if value in archived_ids:
+            raise ValidationError()
+        return value
 
-        with transaction.atomic():
-            order = self.Meta.model.objects.create(**validated_data)
+    def create(self, validated_data):
+        return create_order(validated_data)
 
-            for each in delivery_hours_data:
-                each.order = order
-                each.save()
 
-        return order
+class OrderCompleteSerializer(serializers.Serializer):
+    courier_id = serializers.IntegerField()
+    order_id = serializers.IntegerField()
+    complete_time = serializers.DateTimeField()
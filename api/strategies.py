@@ -0,0 +1,55 @@
+from django.conf import settings
+
+
+def to_units(weight):
+    return int(weight * 100)
+
+
+def greedy(orders, capacity):
+    chosen = []
+    for order in orders:
+        if capacity == 0:
+            break
+        if order.weight <= capacity:
+            chosen.append(order)
+            capacity -= order.weight
+    return chosen
+
+
+def first_fit_decreasing(orders, capacity):
+    return greedy(
+        sorted(orders, key=lambda order: order.weight, reverse=True), capacity
+    )
+
+
+def knapsack(orders, capacity):
+    """Heaviest load that fits, from subset sums of weights in hundredths."""
+    if len(orders) > settings.API_KNAPSACK_MAX_ORDERS:
+        return first_fit_decreasing(orders, capacity)
+
+    limit = to_units(capacity)
+    mask = (1 << limit + 1) - 1
+    weights = [to_units(order.weight) for order in orders]
+    states = [1]
+    for weight in weights:
+        states.append((states[-1] | states[-1] << weight) & mask)
+
+    loaded = states[-1].bit_length() - 1
+    chosen = []
+    for i in range(len(orders), 0, -1):
+        if not states[i - 1] >> loaded & 1:
+            chosen.append(orders[i - 1])
+            loaded -= weights[i - 1]
+    chosen.reverse()
+    return chosen
+
+
+STRATEGIES = {
+    "greedy": greedy,
+    "ffd": first_fit_decreasing,
+    "knapsack": knapsack,
+}
+
+
+def get_strategy(name=None):
+    return STRATEGIES[name or settings.API_ASSIGN_STRATEGY]
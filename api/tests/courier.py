@@ -1,7 +1,15 @@
+from datetime import datetime
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
-from api.models.courier import Courier
+from api.cache import courier_types
+from api.models.courier import Courier, CourierRegion, CourierType, CourierWork
+from api.serializers.courier import CourierSerializer
+from api.serializers.fast import FastCourierSerializer
 
 
 class CouriersTests(APITestCase):
@@ -80,3 +88,158 @@ class CouriersTests(APITestCase):
         url = reverse("api:couriers")
         self.client.post(url, self.invalid_payload, format="json")
         self.assertEqual(Courier.objects.count(), 1)
+
+
+@override_settings(API_BULK_IMPORT=True)
+class CouriersBulkTests(CouriersTests):
+    def test_valid_couriers_relations_db(self):
+        url = reverse("api:couriers")
+        self.client.post(url, self.valid_payload, format="json")
+        self.assertEqual(CourierRegion.objects.count(), 8)
+        self.assertEqual(CourierWork.objects.count(), 3)
+
+    def test_invalid_couriers_db(self):
+        url = reverse("api:couriers")
+        self.client.post(url, self.invalid_payload, format="json")
+        self.assertEqual(Courier.objects.count(), 0)
+
+    def test_duplicate_couriers_response(self):
+        url = reverse("api:couriers")
+        payload = self.valid_payload + [self.valid_payload[0]]
+        response = self.client.post(url, payload, format="json")
+        content = response.json()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(content.get("validation_error").get("couriers"), [{"id": 1}])
+
+    def test_existing_couriers_response(self):
+        url = reverse("api:couriers")
+        self.client.post(url, self.valid_payload[:1], format="json")
+        response = self.client.post(url, self.valid_payload, format="json")
+        content = response.json()
+        self.assertEqual(content.get("validation_error").get("couriers"), [{"id": 1}])
+        self.assertEqual(Courier.objects.count(), 1)
+
+    def test_unknown_type_response(self):
+        url = reverse("api:couriers")
+        self.valid_payload[1]["courier_type"] = "plane"
+        response = self.client.post(url, self.valid_payload, format="json")
+        content = response.json()
+        self.assertEqual(content.get("validation_error").get("couriers"), [{"id": 2}])
+
+
+class CourierTypeRegistryTests(APITestCase):
+    fixtures = ["api/fixtures/courier_type.json"]
+
+    def setUp(self):
+        courier_types.reset()
+        self.payload = [
+            {
+                "courier_id": 1,
+                "courier_type": "foot",
+                "regions": [1],
+                "working_hours": ["09:00-11:00"],
+            }
+        ]
+
+    def test_import_without_type_queries(self):
+        courier_types.all()
+        url = reverse("api:couriers")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url, self.payload, format="json")
+        self.assertFalse(
+            [query for query in queries if "api_couriertype" in query["sql"]]
+        )
+
+    def test_loaded_once(self):
+        courier_types.all()
+        with self.assertNumQueries(0):
+            self.assertEqual(courier_types.get("car").weight, 50)
+            self.assertIsNone(courier_types.get("plane"))
+
+    def test_invalidated_on_save(self):
+        courier_types.all()
+        CourierType.objects.create(id="plane", weight=100, coefficient=12)
+        self.assertEqual(courier_types.get("plane").weight, 100)
+        CourierType.objects.filter(id="plane").delete()
+        self.assertIsNone(courier_types.get("plane"))
+
+    def test_reloaded_after_timeout(self):
+        courier_types.all()
+        CourierType.objects.filter(id="foot").update(weight=15)
+        self.assertEqual(courier_types.get("foot").weight, 10)
+        with override_settings(API_COURIER_TYPE_TIMEOUT=0):
+            courier_types.reset()
+            courier_types.all()
+            CourierType.objects.filter(id="foot").update(weight=20)
+            self.assertEqual(courier_types.get("foot").weight, 20)
+
+
+class CourierWorkingHoursTests(APITestCase):
+    fixtures = ["api/fixtures/courier_type.json"]
+
+    def post(self, courier_id, working_hours):
+        payload = [
+            {
+                "courier_id": courier_id,
+                "courier_type": "foot",
+                "regions": [1],
+                "working_hours": working_hours,
+            }
+        ]
+        return self.client.post(reverse("api:couriers"), payload, format="json")
+
+    def test_same_validation_as_strptime(self):
+        values = ["09:00", "9:05", "9:5", "23:59", "24:00", "12:60", " 9:00", "09:00 "]
+        values += ["0900", "09-00", "+9:00", "09:00:00", ""]
+        for courier_id, value in enumerate(values, start=1):
+            try:
+                datetime.strptime(value, "%H:%M")
+                expected = status.HTTP_201_CREATED
+            except ValueError:
+                expected = status.HTTP_400_BAD_REQUEST
+            response = self.post(courier_id, [f"{value}-23:59"])
+            self.assertEqual(response.status_code, expected, value)
+
+    def test_formatted_in_profile(self):
+        self.post(1, ["9:5-11:00", "00:00-23:59"])
+        url = reverse("api:courier_edit", kwargs={"courier_id": 1})
+        response = self.client.get(url, format="json")
+        self.assertEqual(
+            response.json().get("working_hours"), ["09:05-11:00", "00:00-23:59"]
+        )
+
+    def test_minutes_annotation(self):
+        self.post(1, ["9:5-11:00"])
+        work = CourierWork.objects.with_minutes().get()
+        self.assertEqual((work.minute_from, work.minute_to), (545, 660))
+
+
+@override_settings(API_FAST_SERIALIZERS=True)
+class CouriersFastTests(CouriersTests):
+    def test_same_errors_as_serializer(self):
+        courier = self.valid_payload[0]
+        payload = self.valid_payload + self.invalid_payload
+        payload += [None, "1", {}, dict(courier, courier_id="2.0", extra=1)]
+        payload += [dict(courier, courier_id=value) for value in (None, "", 1.5)]
+        payload += [dict(courier, courier_type=value) for value in ("", [1], "x")]
+        payload += [dict(courier, regions=value) for value in ("1", [1, "a", None])]
+        payload += [dict(courier, working_hours=[" ", None, "12:00-11:00"])]
+
+        serializer = CourierSerializer(data=payload, many=True)
+        fast = FastCourierSerializer(data=payload, many=True)
+        self.assertEqual(serializer.is_valid(), fast.is_valid())
+        self.assertEqual(serializer.errors, fast.errors)
+        for item, fast_item in zip(serializer.errors, fast.errors):
+            self.assertEqual(repr(item), repr(fast_item))
+
+    def test_same_validated_data(self):
+        serializer = CourierSerializer(data=self.valid_payload, many=True)
+        fast = FastCourierSerializer(data=self.valid_payload, many=True)
+        self.assertTrue(serializer.is_valid())
+        self.assertTrue(fast.is_valid())
+        self.assertEqual(serializer.validated_data, fast.validated_data)
+
+
+@override_settings(API_FAST_SERIALIZERS=True)
+class CouriersBulkFastTests(CouriersBulkTests):
+    pass
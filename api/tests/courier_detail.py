@@ -1,7 +1,17 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from api.cache import courier_cache
+from api.models.courier import Courier, CourierRating
+from api.models.order import ArchivedOrder, Order
+from api.serializers.courier import CourierRetrieveSerializer
+from api.serializers.fast import courier_representation
+
 
 class CourierDetailTests(APITestCase):
     fixtures = [
@@ -11,6 +21,7 @@ class CourierDetailTests(APITestCase):
     ]
 
     def setUp(self):
+        courier_cache.clear()
         self.first_url_edit = reverse("api:courier_edit", kwargs={"courier_id": 1})
         self.second_url_edit = reverse("api:courier_edit", kwargs={"courier_id": 2})
         self.third_url_edit = reverse("api:courier_edit", kwargs={"courier_id": 3})
@@ -26,6 +37,12 @@ class CourierDetailTests(APITestCase):
         self.assertIn("rating", content)
         self.assertIn("earnings", content)
 
+    def test_first_courier_profile(self):
+        response = self.client.get(self.first_url_edit, format="json")
+        content = response.json()
+        self.assertEqual(content.get("regions"), [1, 12, 22])
+        self.assertEqual(content.get("working_hours"), ["11:35-14:05", "09:00-11:00"])
+
     def test_first_courier_rating(self):
         response = self.client.get(self.first_url_edit, format="json")
         content = response.json()
@@ -61,3 +78,273 @@ class CourierDetailTests(APITestCase):
         content = response.json()
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(content.get("earnings"), 0)
+
+
+@override_settings(API_ASYNC_WORKERS=0)
+class CourierDetailAsyncTests(CourierDetailTests):
+    def setUp(self):
+        super().setUp()
+        self.first_url_edit = reverse("api:async_courier", kwargs={"courier_id": 1})
+        self.second_url_edit = reverse("api:async_courier", kwargs={"courier_id": 2})
+        self.third_url_edit = reverse("api:async_courier", kwargs={"courier_id": 3})
+
+    def test_same_response(self):
+        response = self.client.get(self.first_url_edit, format="json")
+        courier_cache.clear()
+        url = reverse("api:courier_edit", kwargs={"courier_id": 1})
+        self.assertEqual(response.content, self.client.get(url).content)
+
+    def test_patch_not_allowed(self):
+        response = self.client.patch(
+            self.first_url_edit, {"regions": [1]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+@override_settings(API_FAST_SERIALIZERS=True)
+class CourierDetailFastTests(CourierDetailTests):
+    def test_same_response(self):
+        for url in (self.first_url_edit, self.second_url_edit, self.third_url_edit):
+            response = self.client.get(url, format="json")
+            courier_cache.clear()
+            with self.settings(API_FAST_SERIALIZERS=False):
+                self.assertEqual(response.content, self.client.get(url).content)
+            courier_cache.clear()
+
+    def test_unsummarized_response(self):
+        Courier.objects.update(summary_ready=False)
+        courier = Courier.objects.prefetch_related(
+            "regions", "working_hours", "ratings"
+        ).get(id=1)
+        self.assertEqual(
+            courier_representation(courier),
+            dict(CourierRetrieveSerializer(courier).data),
+        )
+
+
+@override_settings(API_COURIER_CACHE="none")
+class CourierDetailQueriesTests(APITestCase):
+    fixtures = [
+        "api/fixtures/courier_type.json",
+        "api/tests/fixtures/couriers.json",
+        "api/tests/fixtures/couriers_detail.json",
+    ]
+
+    def setUp(self):
+        self.url = reverse("api:courier_edit", kwargs={"courier_id": 1})
+        self.client.get(self.url, format="json")
+
+    def test_queries_count(self):
+        with self.assertNumQueries(4):
+            self.client.get(self.url, format="json")
+
+
+class CourierDetailRatingTests(APITestCase):
+    fixtures = [
+        "api/fixtures/courier_type.json",
+        "api/tests/fixtures/couriers.json",
+        "api/tests/fixtures/couriers_detail.json",
+    ]
+
+    def setUp(self):
+        courier_cache.clear()
+        self.url = reverse("api:courier_edit", kwargs={"courier_id": 1})
+        self.complete_url = reverse("api:order_complete")
+        Order.objects.create(
+            id=8,
+            region=12,
+            weight=1,
+            courier_id=1,
+            assign_time="2021-01-11T10:01:00.42Z",
+        )
+        self.complete_payload = {
+            "courier_id": 1,
+            "order_id": 8,
+            "complete_time": "2021-01-11T10:05:00.42Z",
+        }
+
+    def test_summary_built_on_read(self):
+        self.client.get(self.url, format="json")
+        self.assertTrue(Courier.objects.get(id=1).summary_ready)
+        self.assertEqual(CourierRating.objects.filter(courier_id=1).count(), 3)
+
+    def test_rating_updated_on_complete(self):
+        self.client.get(self.url, format="json")
+        self.client.post(self.complete_url, self.complete_payload, format="json")
+
+        rating = CourierRating.objects.get(courier_id=1, region_id=12)
+        self.assertEqual(rating.delivery_count, 2)
+        self.assertEqual(rating.delivery_time, (25 + 5) * 60)
+
+        response = self.client.get(self.url, format="json")
+        self.assertEqual(response.json().get("rating"), 3.75)
+
+    def test_rating_matches_orders(self):
+        self.client.get(self.url, format="json")
+        self.client.post(self.complete_url, self.complete_payload, format="json")
+
+        courier = Courier.objects.get(id=1)
+        summary = courier.rating
+        courier.summary_ready = False
+        self.assertEqual(summary, courier.rating)
+
+    def test_complete_without_summary(self):
+        self.client.post(self.complete_url, self.complete_payload, format="json")
+        self.assertEqual(CourierRating.objects.count(), 0)
+
+        response = self.client.get(self.url, format="json")
+        self.assertEqual(response.json().get("rating"), 3.75)
+
+    def test_earnings_updated_on_complete(self):
+        self.client.get(self.url, format="json")
+        self.client.post(self.complete_url, self.complete_payload, format="json")
+        self.assertEqual(Courier.objects.get(id=1).earnings, 8500)
+
+        response = self.client.get(self.url, format="json")
+        self.assertEqual(response.json().get("earnings"), 8500)
+
+
+class CourierSummaryCommandTests(APITestCase):
+    fixtures = [
+        "api/fixtures/courier_type.json",
+        "api/tests/fixtures/couriers.json",
+        "api/tests/fixtures/couriers_detail.json",
+    ]
+
+    def test_rebuild(self):
+        call_command("rebuild_courier_summary", stdout=StringIO())
+        self.assertEqual(Courier.objects.filter(summary_ready=True).count(), 3)
+        self.assertEqual(Courier.objects.get(id=2).earnings, 7500)
+
+    def test_check(self):
+        call_command("rebuild_courier_summary", stdout=StringIO())
+        Courier.objects.filter(id=1).update(earnings=0)
+        CourierRating.objects.filter(courier_id=2).update(delivery_count=1)
+
+        out = StringIO()
+        call_command("rebuild_courier_summary", "--check", stdout=out)
+        self.assertIn("Inconsistent summaries: 2", out.getvalue())
+
+
+@override_settings(API_COURIER_CACHE="lru")
+class CourierDetailCacheTests(APITestCase):
+    fixtures = [
+        "api/fixtures/courier_type.json",
+        "api/tests/fixtures/couriers.json",
+        "api/tests/fixtures/couriers_detail.json",
+    ]
+
+    def setUp(self):
+        courier_cache.clear()
+        self.url = reverse("api:courier_edit", kwargs={"courier_id": 1})
+        self.stats_url = reverse("api:courier_cache_stats")
+
+    def test_cached_response(self):
+        first = self.client.get(self.url, format="json").json()
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url, format="json").json()
+        self.assertEqual(first, second)
+
+    def test_stats(self):
+        self.client.get(self.url, format="json")
+        self.client.get(self.url, format="json")
+        response = self.client.get(self.stats_url, format="json")
+        self.assertEqual(response.json().get("hits"), 1)
+        self.assertEqual(response.json().get("misses"), 1)
+
+    def test_invalidated_on_update(self):
+        self.client.get(self.url, format="json")
+        self.client.patch(self.url, data={"regions": [1, 12]}, format="json")
+        response = self.client.get(self.url, format="json")
+        self.assertEqual(response.json().get("regions"), [1, 12])
+
+    def test_invalidated_on_complete(self):
+        self.client.get(self.url, format="json")
+        Order.objects.create(
+            id=8,
+            region=12,
+            weight=1,
+            courier_id=1,
+            assign_time="2021-01-11T10:01:00.42Z",
+        )
+        payload = {
+            "courier_id": 1,
+            "order_id": 8,
+            "complete_time": "2021-01-11T10:05:00.42Z",
+        }
+        self.client.post(reverse("api:order_complete"), payload, format="json")
+        response = self.client.get(self.url, format="json")
+        self.assertEqual(response.json().get("earnings"), 8500)
+
+    def test_missing_courier_not_cached(self):
+        url = reverse("api:courier_edit", kwargs={"courier_id": 10})
+        self.client.get(url, format="json")
+        Courier.objects.create(id=10, type_id="car")
+        response = self.client.get(url, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(API_COURIER_CACHE="default")
+    def test_django_cache_backend(self):
+        first = self.client.get(self.url, format="json").json()
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url, format="json").json()
+        self.assertEqual(first, second)
+        courier_cache.clear()
+
+
+class CourierArchiveTests(APITestCase):
+    fixtures = [
+        "api/fixtures/courier_type.json",
+        "api/tests/fixtures/couriers.json",
+        "api/tests/fixtures/couriers_detail.json",
+    ]
+
+    def setUp(self):
+        courier_cache.clear()
+        self.url = reverse("api:courier_edit", kwargs={"courier_id": 1})
+        self.delivered = Order.objects.filter(is_delivered=True).count()
+
+    def get_profile(self):
+        courier_cache.clear()
+        return self.client.get(self.url, format="json").json()
+
+    def test_orders_archived(self):
+        call_command("archive_orders", stdout=StringIO())
+        self.assertFalse(Order.objects.filter(is_delivered=True).exists())
+        self.assertEqual(ArchivedOrder.objects.count(), self.delivered)
+
+    def test_already_archived_orders_skipped(self):
+        order = Order.objects.filter(is_delivered=True).first()
+        ArchivedOrder.objects.create(id=order.pk, region=order.region, weight=1)
+        call_command("archive_orders", stdout=StringIO())
+        self.assertFalse(Order.objects.filter(is_delivered=True).exists())
+        self.assertEqual(ArchivedOrder.objects.count(), self.delivered)
+        self.assertEqual(ArchivedOrder.objects.get(id=order.pk).weight, 1)
+
+    def test_recent_orders_kept(self):
+        call_command("archive_orders", "--days", "100000", stdout=StringIO())
+        self.assertEqual(ArchivedOrder.objects.count(), 0)
+
+    def test_invalid_options(self):
+        for option in ("--days", "--batch-size", "--interval"):
+            with self.assertRaises(CommandError):
+                call_command("archive_orders", option, "0", stdout=StringIO())
+        self.assertEqual(ArchivedOrder.objects.count(), 0)
+
+    def test_profile_kept(self):
+        profile = self.get_profile()
+        call_command("archive_orders", "--batch-size", "2", stdout=StringIO())
+        self.assertEqual(self.get_profile(), profile)
+
+    def test_profile_kept_without_summary(self):
+        Courier.objects.update(summary_ready=False)
+        profile = self.get_profile()
+        Courier.objects.update(summary_ready=False)
+        call_command("archive_orders", stdout=StringIO())
+        self.assertEqual(self.get_profile(), profile)
+
+    def test_rebuilt_summary_includes_archive(self):
+        profile = self.get_profile()
+        call_command("archive_orders", stdout=StringIO())
+        call_command("rebuild_courier_summary", stdout=StringIO())
+        self.assertEqual(self.get_profile(), profile)
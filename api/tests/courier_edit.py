@@ -1,8 +1,13 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from api.models.order import Order, OrderDelivery
+from api.cache import courier_types
+from api.models.order import OpenOrder, Order, OrderDelivery
 from api.models.courier import Courier, CourierWork, CourierRegion
 
 
@@ -26,6 +31,25 @@ class CourierEditTests(APITestCase):
         response = self.client.patch(self.first_url_edit, data=data, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_all_fields_db(self):
+        data = {
+            "courier_type": "bike",
+            "regions": [12, 23],
+            "working_hours": ["09:00-11:00", "16:00-20:00"],
+        }
+        response = self.client.patch(self.first_url_edit, data=data, format="json")
+        self.assertEqual(response.json().get("courier_type"), "bike")
+        self.assertEqual(Courier.objects.get(id=1).type_id, "bike")
+        self.assertEqual(
+            sorted(
+                CourierRegion.objects.filter(courier_id=1).values_list(
+                    "region_id", flat=True
+                )
+            ),
+            [12, 23],
+        )
+        self.assertEqual(CourierWork.objects.filter(courier_id=1).count(), 2)
+
 
 class CourierEditRegionTests(APITestCase):
     fixtures = [
@@ -233,6 +257,12 @@ class CourierEditWorkingHoursTests(APITestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_change_hours_slots(self):
+        self.client.patch(self.first_url_edit, data=self.change_data, format="json")
+        courier = Courier.objects.get(id=self.courier_id)
+        self.assertIsNotNone(courier.slots)
+        self.assertEqual(courier.slots, courier.collect_slots())
+
     def test_change_hours_order_db(self):
         response = self.client.patch(
             self.first_url_edit, data=self.change_data, format="json"
@@ -257,3 +287,117 @@ class CourierEditWorkingHoursTests(APITestCase):
             ).count(),
             2,
         )
+
+
+class CourierEditQueriesTests(APITestCase):
+    fixtures = [
+        "api/fixtures/courier_type.json",
+        "api/tests/fixtures/couriers.json",
+        "api/tests/fixtures/couriers_edit.json",
+    ]
+
+    def setUp(self):
+        self.first_url_edit = reverse("api:courier_edit", kwargs={"courier_id": 1})
+        courier_types.all()
+        self.data = {
+            "courier_type": "bike",
+            "regions": [12, 23, 24, 25, 26],
+            "working_hours": [f"{hour:02d}:00-{hour:02d}:30" for hour in range(20)],
+        }
+
+    def test_queries_count(self):
+        with self.assertNumQueries(15):
+            self.client.patch(self.first_url_edit, data=self.data, format="json")
+
+    @override_settings(API_ASSIGN_LOCKING=False)
+    def test_queries_count_without_locking(self):
+        with self.assertNumQueries(14):
+            self.client.patch(self.first_url_edit, data=self.data, format="json")
+
+
+class CourierCheckOrdersTests(APITestCase):
+    fixtures = [
+        "api/fixtures/courier_type.json",
+        "api/tests/fixtures/couriers.json",
+        "api/tests/fixtures/couriers_edit.json",
+    ]
+
+    def setUp(self):
+        Order.objects.filter(id=2).update(courier_id=2, assign_time="2021-01-10T09:32Z")
+        CourierWork.objects.filter(id=2).update(time_from="16:00", time_to="20:00")
+        CourierWork.objects.filter(id=3).update(time_from="21:00", time_to="22:00")
+
+    def test_release_unfit(self):
+        released = Order.objects.all().release_unfit()
+        self.assertEqual(sorted(released), [1, 2])
+        self.assertEqual(
+            list(Order.objects.filter(courier_id__isnull=False).values_list("id")),
+            [(4,)],
+        )
+
+    def test_released_orders_open(self):
+        Order.objects.all().release_unfit()
+        self.assertEqual(
+            list(
+                Order.objects.filter(id__in=[1, 2]).values_list(
+                    "courier_id", "assign_time"
+                )
+            ),
+            [(None, None), (None, None)],
+        )
+        self.assertEqual(OpenOrder.objects.filter(order_id__in=[1, 2]).count(), 2)
+
+    def test_check_orders(self):
+        Courier.objects.get(id=1).check_orders()
+        self.assertEqual(Order.objects.filter(courier_id=1).count(), 1)
+        self.assertEqual(Order.objects.filter(courier_id=2).count(), 1)
+
+
+class CourierCapacityTests(APITestCase):
+    fixtures = [
+        "api/fixtures/courier_type.json",
+        "api/tests/fixtures/couriers.json",
+        "api/tests/fixtures/couriers_edit.json",
+    ]
+
+    def setUp(self):
+        self.first_url_edit = reverse("api:courier_edit", kwargs={"courier_id": 1})
+        Courier.objects.filter(id=1).update(type="car")
+        Order.objects.filter(id=3).update(
+            courier_id=1, assign_time="2021-01-10T09:32:14.42Z"
+        )
+        Order.objects.filter(id=4).update(weight=5)
+
+    def assigned(self):
+        return list(
+            Order.objects.filter(courier_id=1, is_delivered=False)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+    def test_patch_keeps_max_weight(self):
+        response = self.client.patch(
+            self.first_url_edit, data={"courier_type": "foot"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.assigned(), [3, 4])
+        self.assertTrue(OpenOrder.objects.filter(order_id=1).exists())
+
+    def test_release_over_capacity(self):
+        Courier.objects.filter(id=1).update(type="foot")
+        released = Order.objects.all().release_over_capacity()
+        self.assertEqual(released, [1])
+        self.assertEqual(self.assigned(), [3, 4])
+
+    def test_release_over_given_capacity(self):
+        released = Order.objects.all().release_over_capacity({1: 5})
+        self.assertEqual(released, [1, 4])
+        self.assertEqual(self.assigned(), [3])
+
+    def test_change_type_command(self):
+        out = StringIO()
+        call_command("change_courier_type", "foot", "--from-type", "car", stdout=out)
+        self.assertEqual(Courier.objects.get(id=1).type_id, "foot")
+        self.assertEqual(Courier.objects.get(id=3).type_id, "foot")
+        self.assertEqual(self.assigned(), [3, 4])
+        self.assertIn("orders released: 1", out.getvalue())
@@ -1,7 +1,12 @@
+import json
+
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
-from api.models.order import Order
+from api.models.order import ArchivedOrder, OpenOrder, Order, OrderDelivery
+from api.serializers.fast import FastOrdersSerializer
+from api.serializers.order import OrdersSerializer
 
 
 class OrdersTests(APITestCase):
@@ -81,3 +86,154 @@ class OrdersTests(APITestCase):
         url = reverse("api:orders")
         self.client.post(url, self.invalid_payload, format="json")
         self.assertEqual(Order.objects.count(), 1)
+
+    def test_archived_orders_response(self):
+        url = reverse("api:orders")
+        ArchivedOrder.objects.create(id=2, region=1, weight=15)
+        response = self.client.post(url, self.valid_payload, format="json")
+        content = response.json()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(content.get("validation_error").get("orders"), [{"id": 2}])
+        self.assertFalse(Order.objects.filter(id=2).exists())
+
+    def test_valid_orders_pool_db(self):
+        url = reverse("api:orders")
+        self.client.post(url, self.valid_payload, format="json")
+        self.assertEqual(
+            list(OpenOrder.objects.order_by("order_id").values_list("order_id")),
+            list(Order.objects.order_by("id").values_list("id")),
+        )
+
+
+@override_settings(API_BULK_IMPORT=True, API_BULK_BATCH_SIZE=2)
+class OrdersBulkTests(OrdersTests):
+    def test_valid_delivery_hours_db(self):
+        url = reverse("api:orders")
+        self.client.post(url, self.valid_payload, format="json")
+        self.assertEqual(OrderDelivery.objects.count(), 4)
+        self.assertEqual(OrderDelivery.objects.filter(order_id=3).count(), 2)
+
+    def test_invalid_orders_response(self):
+        url = reverse("api:orders")
+        invalid_orders = [{"id": 1}, {"id": 3}]
+        response = self.client.post(url, self.invalid_payload, format="json")
+        content = response.json()
+        self.assertEqual(content.get("validation_error").get("orders"), invalid_orders)
+
+    def test_invalid_orders_db(self):
+        url = reverse("api:orders")
+        self.client.post(url, self.invalid_payload, format="json")
+        self.assertEqual(Order.objects.count(), 0)
+        self.assertEqual(OrderDelivery.objects.count(), 0)
+
+    def test_invalid_last_chunk_db(self):
+        url = reverse("api:orders")
+        self.valid_payload[2]["delivery_hours"] = ["09:00"]
+        response = self.client.post(url, self.valid_payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.count(), 0)
+        self.assertFalse(OpenOrder.objects.exists())
+
+    def test_invalid_delivery_hours_response(self):
+        url = reverse("api:orders")
+        self.valid_payload[1]["delivery_hours"] = ["09:00"]
+        self.valid_payload[2]["delivery_hours"] = ["25:00-26:00"]
+        response = self.client.post(url, self.valid_payload, format="json")
+        content = response.json()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            content.get("validation_error").get("orders"), [{"id": 2}, {"id": 3}]
+        )
+
+
+@override_settings(
+    API_BULK_IMPORT=True, API_STREAMING_PARSER=True, API_STREAMING_CHUNK_SIZE=7
+)
+class OrdersStreamingTests(OrdersBulkTests):
+    def test_data_envelope_response(self):
+        url = reverse("api:orders")
+        payload = {"meta": {"source": "sync"}, "data": self.valid_payload}
+        response = self.client.post(url, payload, format="json")
+        content = response.json()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(content.get("orders"), [{"id": 1}, {"id": 2}, {"id": 3}])
+
+    def test_empty_payload_response(self):
+        url = reverse("api:orders")
+        response = self.client.post(url, [], format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json().get("orders"), [])
+
+    def test_malformed_payload_response(self):
+        url = reverse("api:orders")
+        response = self.client.post(
+            url, '[{"order_id": 1}, {"order_id"', content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_trailing_data_response(self):
+        url = reverse("api:orders")
+        payload = json.dumps(self.valid_payload) + " []"
+        response = self.client.post(url, payload, content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_keys_after_data_response(self):
+        url = reverse("api:orders")
+        payload = {"data": self.valid_payload, "meta": {"source": "sync"}}
+        response = self.client.post(url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Order.objects.count(), 3)
+
+    def test_malformed_tail_rolled_back(self):
+        url = reverse("api:orders")
+        payload = json.dumps(self.valid_payload)[:-1] + ', {"order_id"'
+        response = self.client.post(url, payload, content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.count(), 0)
+        self.assertEqual(OrderDelivery.objects.count(), 0)
+        self.assertFalse(OpenOrder.objects.exists())
+
+    def test_large_item_response(self):
+        url = reverse("api:orders")
+        self.valid_payload[0]["delivery_hours"] = ["09:00-18:00"] * 500
+        response = self.client.post(url, self.valid_payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(OrderDelivery.objects.filter(order_id=1).count(), 500)
+
+    def test_missing_data_key_response(self):
+        url = reverse("api:orders")
+        response = self.client.post(url, {"orders": []}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(API_FAST_SERIALIZERS=True)
+class OrdersBulkFastTests(OrdersBulkTests):
+    def test_same_errors_as_serializer(self):
+        order = self.valid_payload[0]
+        payload = self.valid_payload + self.invalid_payload
+        payload += [None, 5, {}, dict(order, region=None, delivery_hours="09:00")]
+        payload += [dict(order, weight=value) for value in ("", "1e3", 0.001, -1)]
+        payload += [dict(order, delivery_hours=["", "18:00-09:00", "9-10"])]
+
+        serializer = OrdersSerializer(data=payload, many=True)
+        fast = FastOrdersSerializer(data=payload, many=True)
+        self.assertEqual(serializer.is_valid(), fast.is_valid())
+        self.assertEqual(serializer.errors, fast.errors)
+        for item, fast_item in zip(serializer.errors, fast.errors):
+            self.assertEqual(repr(item), repr(fast_item))
+
+    def test_same_validated_data(self):
+        serializer = OrdersSerializer(data=self.valid_payload, many=True)
+        fast = FastOrdersSerializer(data=self.valid_payload, many=True)
+        self.assertTrue(serializer.is_valid())
+        self.assertTrue(fast.is_valid())
+        for item, fast_item in zip(serializer.validated_data, fast.validated_data):
+            hours = item.pop("delivery_hours")
+            fast_hours = fast_item.pop("delivery_hours")
+            self.assertEqual(dict(item), fast_item)
+            self.assertEqual(
+                [(each.time_from, each.time_to) for each in hours],
+                [(each.time_from, each.time_to) for each in fast_hours],
+            )
@@ -1,7 +1,19 @@
+import random
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
 from django.urls import reverse
+from django.utils.dateparse import parse_datetime
 from rest_framework import status
-from rest_framework.test import APITestCase
-from api.models.order import Order
+from rest_framework.test import APITestCase, APITransactionTestCase
+from api.cache import courier_types
+from api.dispatch import get_couriers, get_pool
+from api.models.courier import Courier, CourierWork
+from api.models.order import OpenOrder, Order, OrderDelivery
+from api.schedule import IntervalIndex, period_slots
+from api.views.order import OrderAssignView
 
 
 class OrderAssignTests(APITestCase):
@@ -58,6 +70,64 @@ class OrderAssignTests(APITestCase):
         self.assertEqual(orders, 0)
 
 
+@override_settings(API_ASYNC_WORKERS=0)
+class OrderAssignAsyncTests(OrderAssignTests):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("api:async_order_assign")
+        self.complete_url = reverse("api:async_order_complete")
+
+
+@override_settings(API_ASYNC_WORKERS=2)
+class OrderAssignAsyncPoolTests(APITransactionTestCase):
+    fixtures = [
+        "api/fixtures/courier_type.json",
+        "api/tests/fixtures/couriers.json",
+        "api/tests/fixtures/orders.json",
+    ]
+
+    def test_assign_in_pool(self):
+        url = reverse("api:async_order_assign")
+        response = self.client.post(url, {"courier_id": 2}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        assigned = [order["id"] for order in response.json()["orders"]]
+        self.assertTrue(assigned)
+        self.assertEqual(
+            list(Order.objects.filter(courier_id=2).values_list("id", flat=True)),
+            assigned,
+        )
+
+
+class OrderAssignLockingTests(APITestCase):
+    fixtures = [
+        "api/fixtures/courier_type.json",
+        "api/tests/fixtures/couriers.json",
+        "api/tests/fixtures/orders.json",
+    ]
+
+    def setUp(self):
+        self.courier = Courier.objects.get(id=2)
+        self.view = OrderAssignView()
+
+    @override_settings(API_ASSIGN_LOCKING=True)
+    def test_orders_locked(self):
+        query = self.view.get_orders(self.courier, 15).query
+        self.assertTrue(query.select_for_update)
+        self.assertTrue(query.select_for_update_skip_locked)
+
+    @override_settings(API_ASSIGN_LOCKING=False)
+    def test_orders_not_locked(self):
+        query = self.view.get_orders(self.courier, 15).query
+        self.assertFalse(query.select_for_update)
+
+    @override_settings(API_ASSIGN_LOCKING=False)
+    def test_response_without_locking(self):
+        url = reverse("api:order_assign")
+        response = self.client.post(url, {"courier_id": 2}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.json().get("orders"), [])
+
+
 class OrderAssignTimeTests(APITestCase):
     fixtures = [
         "api/fixtures/courier_type.json",
@@ -95,6 +165,15 @@ class OrderAssignTimeTests(APITestCase):
         orders_count = Order.objects.exclude(id__in=orders_id).count()
         self.assertEqual(orders_count, 2)
 
+    def test_assign_time_in_db(self):
+        response = self.client.post(self.url, self.first_courier, format="json")
+        assign_time = parse_datetime(response.json().get("assign_time"))
+        orders = Order.objects.filter(courier_id=1).order_by("id")
+        self.assertEqual(
+            list(orders.values_list("id", "assign_time")),
+            [(1, assign_time), (3, assign_time), (4, assign_time)],
+        )
+
     def test_orders_empty_in_response(self):
         response = self.client.post(self.url, self.third_courier, format="json")
         content = response.json()
@@ -149,3 +228,303 @@ class OrderAssignWeightTests(APITestCase):
         self.client.post(self.url, self.third_courier, format="json")
         orders_count = Order.objects.filter(courier_id__isnull=True).count()
         self.assertEqual(orders_count, 2)
+
+
+class OrderAssignIntervalTests(APITestCase):
+    fixtures = [
+        "api/fixtures/courier_type.json",
+        "api/tests/fixtures/couriers.json",
+        "api/tests/fixtures/orders_assign_interval.json",
+    ]
+
+    def setUp(self):
+        self.url = reverse("api:order_assign")
+        self.courier = {"courier_id": 2}
+        CourierWork.objects.filter(courier_id=2).update(
+            time_from="10:00", time_to="12:00"
+        )
+
+    def test_id_in_response(self):
+        response = self.client.post(self.url, self.courier, format="json")
+        orders_id = [item.get("id") for item in response.json().get("orders")]
+        self.assertEqual(orders_id, [4, 5])
+
+    def test_orders_filtered_in_db(self):
+        courier = Courier.objects.get(id=2)
+        orders = OrderAssignView().get_orders(courier, 15)
+        self.assertEqual(sorted(order.id for order in orders), [4, 5])
+
+    def test_queries_count(self):
+        courier_types.all()
+        with self.assertNumQueries(10):
+            self.client.post(self.url, self.courier, format="json")
+
+
+@override_settings(API_SCHEDULE_SLOTS=True)
+class OrderAssignSlotsTests(OrderAssignIntervalTests):
+    def setUp(self):
+        super().setUp()
+        Order.objects.create(id=30, region=22, weight=1)
+        OrderDelivery.objects.create(order_id=30, time_from="14:00", time_to="15:00")
+        call_command("rebuild_schedule_slots", stdout=StringIO())
+
+    def get_orders(self):
+        courier = Courier.objects.prefetch_related("working_hours").get(id=2)
+        return sorted(order.id for order in OrderAssignView().get_orders(courier, 15))
+
+    def test_orders_filtered_in_db(self):
+        # windows touching 10:00 or 12:00 share a slot, eligible_orders drops them
+        self.assertEqual(self.get_orders(), [1, 2, 3, 4, 5])
+
+    def test_orders_without_slots_kept(self):
+        Order.objects.filter(id=30).update(slots_am=None, slots_pm=None)
+        self.assertEqual(self.get_orders(), [1, 2, 3, 4, 5, 30])
+
+    def test_stored_courier_slots_used(self):
+        Courier.objects.filter(id=2).update(slots_am=0, slots_pm=0)
+        self.assertEqual(self.get_orders(), [])
+
+    def test_slots_stored_on_import(self):
+        payload = [
+            {
+                "order_id": 40,
+                "weight": 1,
+                "region": 22,
+                "delivery_hours": ["10:15-10:45", "13:00-13:00"],
+            }
+        ]
+        self.client.post(reverse("api:orders"), payload, format="json")
+        order = Order.objects.get(id=40)
+        self.assertEqual(order.slots, 0b111 << 41 | 1 << 52)
+        self.assertEqual(order.slots, order.collect_slots())
+
+    def test_rebuild_command(self):
+        Order.objects.filter(id__in=[1, 2]).update(slots_am=0, slots_pm=0)
+        out = StringIO()
+        call_command("rebuild_schedule_slots", "--check", stdout=out)
+        self.assertIn("Order stale bitmaps: 2", out.getvalue())
+        call_command("rebuild_schedule_slots", stdout=StringIO())
+        self.assertEqual(self.get_orders(), [1, 2, 3, 4, 5])
+
+    def test_slots_never_drop_overlaps(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            work = sorted(rng.randrange(24 * 60) for _ in range(2))
+            delivery = [rng.randrange(24 * 60) for _ in range(2)]
+            if IntervalIndex([(*delivery, 0)]).overlapping(*work):
+                self.assertTrue(period_slots(*work) & period_slots(*delivery))
+
+
+class OrderAssignStrategyTests(APITestCase):
+    fixtures = [
+        "api/fixtures/courier_type.json",
+        "api/tests/fixtures/couriers.json",
+    ]
+
+    def setUp(self):
+        self.url = reverse("api:order_assign")
+        for order_id, weight in ((1, 6), (2, 5), (3, 5), (4, 3.5)):
+            Order.objects.create(id=order_id, region=12, weight=weight)
+            OrderDelivery.objects.create(
+                order_id=order_id, time_from="10:00", time_to="12:00"
+            )
+
+    def assign(self, strategy):
+        payload = {"courier_id": 1, "strategy": strategy}
+        response = self.client.post(self.url, payload, format="json")
+        return [item.get("id") for item in response.json().get("orders")]
+
+    def test_greedy(self):
+        self.assertEqual(self.assign("greedy"), [1, 4])
+
+    def test_first_fit_decreasing(self):
+        Order.objects.filter(id=4).update(weight=4)
+        self.assertEqual(self.assign("ffd"), [1, 4])
+
+    def test_knapsack(self):
+        self.assertEqual(self.assign("knapsack"), [2, 3])
+
+    @override_settings(API_KNAPSACK_MAX_ORDERS=2)
+    def test_knapsack_fallback(self):
+        self.assertEqual(self.assign("knapsack"), [1, 4])
+
+    @override_settings(API_ASSIGN_STRATEGY="knapsack")
+    def test_default_strategy(self):
+        response = self.client.post(self.url, {"courier_id": 1}, format="json")
+        orders_id = [item.get("id") for item in response.json().get("orders")]
+        self.assertEqual(orders_id, [2, 3])
+
+    def test_unknown_strategy(self):
+        payload = {"courier_id": 1, "strategy": "random"}
+        response = self.client.post(self.url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_strategy_type(self):
+        for strategy in (["greedy"], {"name": "greedy"}, 1):
+            payload = {"courier_id": 1, "strategy": strategy}
+            response = self.client.post(self.url, payload, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OrderAssignPoolTests(APITestCase):
+    fixtures = [
+        "api/fixtures/courier_type.json",
+        "api/tests/fixtures/couriers.json",
+        "api/tests/fixtures/orders.json",
+    ]
+
+    def setUp(self):
+        self.url = reverse("api:order_assign")
+
+    def pool(self):
+        return list(
+            OpenOrder.objects.order_by("order_id").values_list("order_id", flat=True)
+        )
+
+    def test_assigned_orders_leave_pool(self):
+        response = self.client.post(self.url, {"courier_id": 2}, format="json")
+        assigned = [order["id"] for order in response.json()["orders"]]
+        self.assertTrue(assigned)
+        self.assertFalse(set(assigned) & set(self.pool()))
+
+    def test_orders_outside_pool_not_assigned(self):
+        OpenOrder.objects.all().delete()
+        response = self.client.post(self.url, {"courier_id": 2}, format="json")
+        self.assertEqual(response.json()["orders"], [])
+
+    def test_released_orders_enter_pool(self):
+        response = self.client.post(self.url, {"courier_id": 2}, format="json")
+        assigned = [order["id"] for order in response.json()["orders"]]
+        Order.objects.filter(id__in=assigned).release()
+        self.assertTrue(set(assigned) <= set(self.pool()))
+
+    def test_backfill_after_migrate(self):
+        expected = self.pool()
+        OpenOrder.objects.all().delete()
+        OpenOrder.backfill()
+        self.assertEqual(self.pool(), expected)
+
+    def test_deleted_courier_orders_enter_pool(self):
+        response = self.client.post(self.url, {"courier_id": 2}, format="json")
+        assigned = [order["id"] for order in response.json()["orders"]]
+        Courier.objects.filter(id=2).delete()
+        self.assertTrue(set(assigned) <= set(self.pool()))
+
+    def test_stale_pool_not_assigned(self):
+        Order.objects.filter(id=3).update(region=1)
+        response = self.client.post(self.url, {"courier_id": 2}, format="json")
+        self.assertEqual(response.json()["orders"], [])
+        self.assertIsNone(Order.objects.get(id=3).courier_id)
+
+    def test_bulk_created_orders_enter_pool(self):
+        Order.objects.bulk_create(
+            [
+                Order(id=100, region=1, weight=1),
+                Order(id=101, region=1, weight=1, is_delivered=True),
+            ]
+        )
+        self.assertIn(100, self.pool())
+        self.assertNotIn(101, self.pool())
+
+    def test_rebuild_command(self):
+        expected = self.pool()
+        OpenOrder.objects.all().delete()
+        out = StringIO()
+        call_command("rebuild_open_orders", "--check", stdout=out)
+        self.assertIn(f"Missing orders: {len(expected)}", out.getvalue())
+        call_command("rebuild_open_orders", stdout=StringIO())
+        self.assertEqual(self.pool(), expected)
+
+
+class OrderAssignFleetTests(APITestCase):
+    fixtures = [
+        "api/fixtures/courier_type.json",
+        "api/tests/fixtures/couriers.json",
+    ]
+
+    def setUp(self):
+        self.url = reverse("api:order_assign_fleet")
+        courier_types.all()
+        for order_id in range(10, 18):
+            Order.objects.create(id=order_id, region=22, weight=2)
+            OrderDelivery.objects.create(
+                order_id=order_id, time_from="10:00", time_to="10:30"
+            )
+
+    def assign(self, courier_ids):
+        response = self.client.post(
+            self.url, {"courier_ids": courier_ids}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {
+            item["courier_id"]: [order["id"] for order in item["orders"]]
+            for item in response.json()["couriers"]
+        }
+
+    def test_single_courier_like_assign(self):
+        self.assertEqual(self.assign([1]), {1: [10, 11, 12, 13, 14]})
+        response = self.client.post(
+            reverse("api:order_assign"), {"courier_id": 1}, format="json"
+        )
+        self.assertEqual(
+            [order["id"] for order in response.json()["orders"]],
+            [10, 11, 12, 13, 14],
+        )
+
+    def test_fair_allocation(self):
+        self.assertEqual(
+            self.assign([1, 2]), {1: [10, 12, 14, 16], 2: [11, 13, 15, 17]}
+        )
+        self.assertFalse(Order.objects.filter(courier_id__isnull=True).exists())
+        self.assertFalse(OpenOrder.objects.exists())
+
+    def test_pending_orders_kept(self):
+        self.assign([1])
+        self.assertEqual(
+            self.assign([1, 2, 3]), {1: [10, 11, 12, 13, 14], 2: [15, 16, 17], 3: []}
+        )
+
+    def test_unknown_courier(self):
+        response = self.client.post(self.url, {"courier_ids": [1, 5]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json().get("validation_error").get("couriers"), [{"id": 5}]
+        )
+        self.assertFalse(Order.objects.filter(courier_id__isnull=False).exists())
+
+    def test_invalid_request(self):
+        response = self.client.post(self.url, {"courier_ids": "1"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_queries_count(self):
+        with self.assertNumQueries(10):
+            self.assign([1, 2, 3])
+
+    def test_one_index_per_region(self):
+        Order.objects.create(id=20, region=12, weight=2)
+        OrderDelivery.objects.create(order_id=20, time_from="10:00", time_to="10:30")
+        with mock.patch("api.dispatch.IntervalIndex", wraps=IntervalIndex) as index:
+            self.assign([1, 2, 3])
+        self.assertEqual(index.call_count, 2)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("assign_fleet", "--courier", "1", "2", stdout=out)
+        self.assertIn("assigned orders: 8", out.getvalue())
+
+
+@override_settings(API_SCHEDULE_SLOTS=True)
+class OrderAssignFleetSlotsTests(OrderAssignFleetTests):
+    def setUp(self):
+        super().setUp()
+        call_command("rebuild_schedule_slots", stdout=StringIO())
+
+    def test_orders_outside_schedules_not_fetched(self):
+        Order.objects.create(id=30, region=22, weight=2)
+        OrderDelivery.objects.create(order_id=30, time_from="20:00", time_to="21:00")
+        Order.objects.get(id=30).refresh_slots()
+        couriers = get_couriers([1, 2])
+        slots = couriers[0].collect_slots() | couriers[1].collect_slots()
+        pool = get_pool({22}, 50, slots)
+        self.assertEqual([order.id for order in pool[22]], list(range(10, 18)))
+        self.assertEqual(self.assign([1, 2])[1], [10, 12, 14, 16])
@@ -1,7 +1,10 @@
+from django.test import override_settings
 from django.urls import reverse
 from faker import Faker
 from rest_framework import status
 from rest_framework.test import APITestCase
+from api.cache import courier_types
+from api.models.courier import Courier, CourierRating
 from api.models.order import Order
 
 fake = Faker()
@@ -35,8 +38,177 @@ class OrderCompleteTests(APITestCase):
         response = self.client.post(url, self.valid_payload, format="json")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_complete_twice_rating_unchanged(self):
+        Order.objects.filter(id=3).update(courier_id=2, assign_time=fake.date_time())
+        Courier.objects.get(id=2).ensure_summary()
+        url = reverse("api:order_complete")
+
+        self.client.post(url, self.valid_payload, format="json")
+        ratings = list(CourierRating.objects.filter(courier_id=2).values())
+        response = self.client.post(url, self.valid_payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(CourierRating.objects.filter(courier_id=2).values()), ratings
+        )
+
+    def test_complete_twice_earnings_unchanged(self):
+        Order.objects.filter(id=3).update(courier_id=2, assign_time=fake.date_time())
+        Courier.objects.get(id=2).ensure_summary()
+        url = reverse("api:order_complete")
+
+        self.client.post(url, self.valid_payload, format="json")
+        earnings = Courier.objects.get(id=2).earnings
+        self.client.post(url, self.valid_payload, format="json")
+        self.assertEqual(Courier.objects.get(id=2).earnings, earnings)
+        self.assertEqual(earnings, Courier.objects.get(id=2).collect_earnings())
+
+    def test_out_of_order_completion_rating(self):
+        Order.objects.filter(id__in=[1, 2]).update(
+            courier_id=1, region=12, assign_time="2021-01-10T10:00:00Z"
+        )
+        Courier.objects.get(id=1).ensure_summary()
+        url = reverse("api:order_complete")
+
+        for order_id, complete_time in ((2, "10:30"), (1, "10:10")):
+            payload = {
+                "courier_id": 1,
+                "order_id": order_id,
+                "complete_time": f"2021-01-10T{complete_time}:00Z",
+            }
+            self.client.post(url, payload, format="json")
+        rating = CourierRating.objects.get(courier_id=1, region_id=12)
+        self.assertEqual((rating.delivery_time, rating.delivery_count), (1800, 2))
+        self.assertEqual(Courier.objects.get(id=1).rating, 3.75)
+
     def test_complete_invalid_order(self):
         url = reverse("api:order_complete")
 
         response = self.client.post(url, self.invalid_payload, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(API_ASYNC_WORKERS=0)
+class OrderCompleteAsyncTests(OrderCompleteTests):
+    def test_complete_valid_order(self):
+        Order.objects.filter(id=3).update(
+            **{"courier_id": 2, "assign_time": fake.date_time()}
+        )
+        url = reverse("api:async_order_complete")
+
+        response = self.client.post(url, self.valid_payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"order_id": 3})
+        self.assertTrue(Order.objects.get(id=3).is_delivered)
+
+    def test_complete_invalid_order(self):
+        url = reverse("api:async_order_complete")
+
+        response = self.client.post(url, self.invalid_payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OrderCompleteBatchTests(APITestCase):
+    fixtures = [
+        "api/fixtures/courier_type.json",
+        "api/tests/fixtures/couriers.json",
+        "api/tests/fixtures/orders.json",
+    ]
+
+    def setUp(self):
+        self.url = reverse("api:order_complete_batch")
+        Order.objects.update(courier_id=2, assign_time="2021-01-10T10:00:00.42Z")
+        Courier.objects.get(id=2).rebuild_summary()
+        courier_types.all()
+
+    def item(self, order_id, courier_id=2, complete_time="2021-01-10T10:30:00.42Z"):
+        return {
+            "courier_id": courier_id,
+            "order_id": order_id,
+            "complete_time": complete_time,
+        }
+
+    def test_results(self):
+        payload = [
+            self.item(1),
+            self.item(2, courier_id=1),
+            self.item(3, complete_time="yesterday"),
+            {"order_id": 4},
+            self.item(1),
+        ]
+        response = self.client.post(self.url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json().get("orders"),
+            [
+                {"order_id": 1, "status": "completed"},
+                {"order_id": 2, "status": "not_found"},
+                {"order_id": 3, "status": "invalid"},
+                {"order_id": 4, "status": "invalid"},
+                {"order_id": 1, "status": "already_completed"},
+            ],
+        )
+
+    def test_completed_db(self):
+        self.client.post(self.url, [self.item(1), self.item(3)], format="json")
+        self.assertEqual(
+            list(
+                Order.objects.filter(is_delivered=True)
+                .order_by("id")
+                .values_list("id", "courier_price")
+            ),
+            [(1, 2500), (3, 2500)],
+        )
+
+    def test_summary_updated(self):
+        payload = [
+            self.item(1, complete_time="2021-01-10T10:10:00.42Z"),
+            self.item(2, complete_time="2021-01-10T10:20:00.42Z"),
+            self.item(3, complete_time="2021-01-10T10:30:00.42Z"),
+        ]
+        self.client.post(self.url, payload, format="json")
+        courier = Courier.objects.get(id=2)
+        self.assertEqual(courier.earnings, courier.collect_earnings())
+        self.assertEqual(
+            {
+                (rating.region_id, rating.delivery_time, rating.delivery_count)
+                for rating in CourierRating.objects.filter(courier_id=2)
+            },
+            {
+                (rating.region_id, rating.delivery_time, rating.delivery_count)
+                for rating in courier.collect_ratings()
+            },
+        )
+
+    def test_out_of_order_batch(self):
+        Order.objects.update(region=12)
+        Courier.objects.get(id=2).rebuild_summary()
+        payload = [
+            self.item(3, complete_time="2021-01-10T10:30:00.42Z"),
+            self.item(1, complete_time="2021-01-10T10:10:00.42Z"),
+            self.item(2, complete_time="2021-01-10T10:20:00.42Z"),
+        ]
+        self.client.post(self.url, payload, format="json")
+        rating = CourierRating.objects.get(courier_id=2, region_id=12)
+        self.assertEqual((rating.delivery_time, rating.delivery_count), (1800, 3))
+
+    def test_batch_before_folded_orders(self):
+        Order.objects.update(region=12)
+        Courier.objects.get(id=2).rebuild_summary()
+        self.client.post(self.url, [self.item(3)], format="json")
+        payload = [
+            self.item(2, complete_time="2021-01-10T10:20:00.42Z"),
+            self.item(1, complete_time="2021-01-10T10:10:00.42Z"),
+        ]
+        self.client.post(self.url, payload, format="json")
+        rating = CourierRating.objects.get(courier_id=2, region_id=12)
+        self.assertEqual((rating.delivery_time, rating.delivery_count), (1800, 3))
+
+    def test_queries_count(self):
+        Order.objects.update(region=1)
+        payload = [self.item(order_id) for order_id in (1, 2, 3)]
+        with self.assertNumQueries(14):
+            self.client.post(self.url, payload, format="json")
+
+    def test_invalid_request(self):
+        response = self.client.post(self.url, {"order_id": 1}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,6 +1,6 @@
 from django.urls import include, path
 
-from api.views import courier, order
+from api.views import asgi, courier, order
 from rest_framework.routers import DefaultRouter
 from .yasg import urlpatterns as doc_urls
 
@@ -13,7 +13,25 @@ urlpatterns = [
     path("couriers/<courier_id>", courier.CourierView.as_view(), name="courier_edit"),
     path("orders", order.OrdersView.as_view(), name="orders"),
     path("orders/assign", order.OrderAssignView.as_view(), name="order_assign"),
+    path(
+        "orders/assign/fleet",
+        order.OrderAssignFleetView.as_view(),
+        name="order_assign_fleet",
+    ),
     path("orders/complete", order.OrderCompleteView.as_view(), name="order_complete"),
+    path(
+        "orders/complete/batch",
+        order.OrderCompleteBatchView.as_view(),
+        name="order_complete_batch",
+    ),
+    path("async/couriers/<courier_id>", asgi.courier_detail, name="async_courier"),
+    path("async/orders/assign", asgi.order_assign, name="async_order_assign"),
+    path("async/orders/complete", asgi.order_complete, name="async_order_complete"),
+    path(
+        "metrics/courier-cache",
+        courier.CourierCacheStatsView.as_view(),
+        name="courier_cache_stats",
+    ),
 ]
 
 urlpatterns += doc_urls
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from api.views.courier import CourierView
+from api.views.order import OrderAssignView, OrderCompleteView
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.API_ASYNC_WORKERS, thread_name_prefix="api-db"
+            )
+        return _executor
+
+
+def call_view(view, request, *args, **kwargs):
+    response = view(request, *args, **kwargs)
+    if hasattr(response, "render"):
+        response.render()
+    return response
+
+
+def call_view_in_pool(view, request, *args, **kwargs):
+    close_old_connections()
+    try:
+        return call_view(view, request, *args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def async_view(view):
+    """Run a synchronous view in the shared thread pool."""
+
+    async def wrapper(request, *args, **kwargs):
+        if not settings.API_ASYNC_WORKERS:
+            return await sync_to_async(call_view)(view, request, *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_executor(),
+            partial(call_view_in_pool, view, request, *args, **kwargs),
+        )
+
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+order_assign = async_view(OrderAssignView.as_view())
+order_complete = async_view(OrderCompleteView.as_view())
+courier_detail = async_view(CourierView.as_view(http_method_names=["get"]))
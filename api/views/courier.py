@@ -1,8 +1,10 @@
+from django.conf import settings
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from api.cache import courier_cache
 from api.models.courier import Courier
 from api.schemas.courier import (
     CouriersPostRequest,
@@ -16,9 +18,16 @@ from api.serializers.courier import (
     CourierUpdateSerializer,
     CourierRetrieveSerializer,
 )
+from api.serializers.fast import FastCourierSerializer, courier_representation
+from api.views.mixins import BulkImportMixin
 
 
-class CouriersView(APIView):
+class CouriersView(BulkImportMixin, APIView):
+    serializer_class = CourierSerializer
+    fast_serializer_class = FastCourierSerializer
+    id_field = "courier_id"
+    response_key = "couriers"
+
     @swagger_auto_schema(
         request_body=CouriersPostRequest(),
         responses=COURIERS_RESPONSE,
@@ -27,12 +36,15 @@ class CouriersView(APIView):
     )
     def post(self, request, format=None):
         data = request.data
+        if settings.API_BULK_IMPORT:
+            return self.bulk_import(data)
+
         errors = []
         success = []
 
         for courier in data:
             try:
-                serializer = CourierSerializer(data=courier)
+                serializer = self.get_serializer_class()(data=courier)
                 if serializer.is_valid():
                     serializer.save()
                     success.append({"id": courier.get("courier_id")})
@@ -79,8 +91,34 @@ class CourierView(APIView):
         tags=["Couriers"],
     )
     def get(self, request, courier_id, format=None):
-        courier = Courier.objects.filter(id=courier_id).first()
-        if courier is None:
+        try:
+            courier_id = int(courier_id)
+        except ValueError:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+
+        data = courier_cache.get_or_set(courier_id, lambda: self.get_data(courier_id))
+        if data is None:
             return Response(status=status.HTTP_400_BAD_REQUEST)
-        serializer = CourierRetrieveSerializer(courier)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(data, status=status.HTTP_200_OK)
+
+    def get_data(self, courier_id):
+        courier = (
+            Courier.objects.filter(id=courier_id)
+            .prefetch_related("regions", "working_hours", "ratings")
+            .first()
+        )
+        if courier is None:
+            return None
+        courier.ensure_summary()
+        if settings.API_FAST_SERIALIZERS:
+            return courier_representation(courier)
+        return dict(CourierRetrieveSerializer(courier).data)
+
+
+class CourierCacheStatsView(APIView):
+    @swagger_auto_schema(
+        operation_summary="Courier profile cache statistics",
+        tags=["Monitoring"],
+    )
+    def get(self, request, format=None):
+        return Response(courier_cache.stats(), status=status.HTTP_200_OK)
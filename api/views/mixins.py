@@ -0,0 +1,113 @@
+from collections.abc import Iterator
+from itertools import islice
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.parsers import StreamingJSONParser
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+class BulkImportMixin:
+    serializer_class = None
+    fast_serializer_class = None
+    id_field = None
+    response_key = None
+
+    def get_parsers(self):
+        if settings.API_STREAMING_PARSER:
+            return [StreamingJSONParser()]
+        return super().get_parsers()
+
+    def get_serializer_class(self):
+        if settings.API_FAST_SERIALIZERS and self.fast_serializer_class is not None:
+            return self.fast_serializer_class
+        return self.serializer_class
+
+    def get_serializer_context(self):
+        return {}
+
+    def get_batch_size(self):
+        return settings.API_BULK_BATCH_SIZE
+
+    def get_item_id(self, item):
+        if isinstance(item, dict):
+            return item.get(self.id_field)
+        return None
+
+    def get_item_key(self, pk):
+        try:
+            return int(pk)
+        except (TypeError, ValueError):
+            return None
+
+    def get_existing_ids(self, ids):
+        model = self.serializer_class.Meta.model
+        return set(model.objects.filter(id__in=ids).values_list("id", flat=True))
+
+    def validate_chunk(self, chunk, context, seen):
+        serializer_class = self.get_serializer_class()
+        serializer = serializer_class(data=chunk, many=True, context=context)
+        serializer.is_valid()
+        item_errors = serializer.errors or [{}] * len(chunk)
+
+        ids = [self.get_item_id(item) for item in chunk]
+        keys = [self.get_item_key(pk) for pk in ids]
+        existing = self.get_existing_ids([key for key in keys if key is not None])
+        errors = []
+        for pk, key, item_error in zip(ids, keys, item_errors):
+            if item_error or key in seen or key in existing:
+                errors.append({"id": pk})
+            seen.add(key)
+        return serializer, ids, errors
+
+    def save_chunk(self, serializer, ids):
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            keys = [self.get_item_key(pk) for pk in ids]
+            existing = self.get_existing_ids([key for key in keys if key is not None])
+            duplicates = [pk for pk, key in zip(ids, keys) if key in existing]
+            return [{"id": pk} for pk in duplicates or ids]
+        return []
+
+    def bulk_import(self, data):
+        if not isinstance(data, (list, Iterator)):
+            return Response(
+                {"validation_error": {self.response_key: []}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        context = self.get_serializer_context()
+        success = []
+        errors = []
+        seen = set()
+        with transaction.atomic():
+            for chunk in chunked(data, self.get_batch_size()):
+                serializer, ids, chunk_errors = self.validate_chunk(
+                    chunk, context, seen
+                )
+                success += [{"id": pk} for pk in ids]
+                errors += chunk_errors
+                if not errors:
+                    errors += self.save_chunk(serializer, ids)
+            if errors:
+                transaction.set_rollback(True)
+
+        if errors:
+            return Response(
+                {"validation_error": {self.response_key: errors}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response({self.response_key: success}, status=status.HTTP_201_CREATED)
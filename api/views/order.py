@@ -1,11 +1,18 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch, Q
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework import status
+from rest_framework import serializers, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 
-from api.models.courier import Courier
-from api.models.order import Order
+from api.cache import courier_cache, courier_types
+from api.dispatch import assign_fleet, get_couriers
+from api.models.courier import Courier, CourierWork
+from api.models.order import Order, OrderDelivery
 from api.schemas.order import (
     OrdersPostRequest,
     OrdersAssignPostRequest,
@@ -13,11 +20,23 @@ from api.schemas.order import (
     ORDERS_RESPONSE,
     ASSIGN_ORDER_RESPONSE,
     COMPLETE_ORDER_RESPONSE,
+    OrdersCompleteItem,
+    COMPLETE_BATCH_RESPONSE,
+    OrdersAssignFleetRequest,
+    ASSIGN_FLEET_RESPONSE,
 )
-from api.serializers.order import OrdersSerializer
+from api.serializers.fast import FastOrdersSerializer
+from api.serializers.order import OrderCompleteSerializer, OrdersSerializer
+from api.strategies import STRATEGIES
+from api.views.mixins import BulkImportMixin
+
 
+class OrdersView(BulkImportMixin, APIView):
+    serializer_class = OrdersSerializer
+    fast_serializer_class = FastOrdersSerializer
+    id_field = "order_id"
+    response_key = "orders"
 
-class OrdersView(APIView):
     @swagger_auto_schema(
         request_body=OrdersPostRequest(many=True),
         responses=ORDERS_RESPONSE,
@@ -26,12 +45,15 @@ class OrdersView(APIView):
     )
     def post(self, request, format=None):
         data = request.data
+        if settings.API_BULK_IMPORT:
+            return self.bulk_import(data)
+
         errors = []
         success = []
 
         for order in data:
             try:
-                serializer = OrdersSerializer(data=order)
+                serializer = self.get_serializer_class()(data=order)
                 if serializer.is_valid():
                     serializer.save()
                     success.append({"id": order.get("order_id")})
@@ -50,6 +72,50 @@ class OrdersView(APIView):
 
 
 class OrderAssignView(APIView):
+    def get_courier(self, courier_id):
+        couriers = Courier.objects.filter(id=courier_id)
+        if settings.API_ASSIGN_LOCKING:
+            couriers = couriers.select_for_update()
+        return couriers.prefetch_related(
+            Prefetch(
+                "working_hours",
+                queryset=CourierWork.objects.with_minutes().only("courier"),
+            )
+        ).first()
+
+    def get_orders(self, courier, weight):
+        regions = courier.regions_id
+        orders = Order.objects.filter(
+            open_order__region__in=regions,
+            open_order__weight__lte=weight,
+            region__in=regions,
+            weight__lte=weight,
+            courier_id__isnull=True,
+            is_delivered=False,
+        )
+        if settings.API_SCHEDULE_SLOTS:
+            orders = orders.fitting_slots(courier.stored_slots())
+        else:
+            working_hours = CourierWork.objects.filter(courier_id=courier.pk).filter(
+                Q(
+                    time_from__lte=OuterRef("time_from"),
+                    time_to__gt=OuterRef("time_from"),
+                )
+                | Q(time_from__lt=OuterRef("time_to"), time_to__gte=OuterRef("time_to"))
+            )
+            delivery_hours = OrderDelivery.objects.filter(
+                order_id=OuterRef("pk")
+            ).filter(Exists(working_hours))
+            orders = orders.filter(Exists(delivery_hours))
+        if settings.API_ASSIGN_LOCKING:
+            orders = orders.select_for_update(skip_locked=True)
+        return orders.prefetch_related(
+            Prefetch(
+                "delivery_hours",
+                queryset=OrderDelivery.objects.with_minutes().only("order"),
+            )
+        ).order_by("id")
+
     @swagger_auto_schema(
         request_body=OrdersAssignPostRequest(),
         responses=ASSIGN_ORDER_RESPONSE,
@@ -58,34 +124,32 @@ class OrderAssignView(APIView):
     )
     def post(self, request, format=None):
         courier_id = request.data.get("courier_id")
-        courier = (
-            Courier.objects.filter(id=courier_id)
-            .prefetch_related("working_hours")
-            .first()
-        )
-        if courier is None:
+        strategy = request.data.get("strategy")
+        if strategy is not None and (
+            not isinstance(strategy, str) or strategy not in STRATEGIES
+        ):
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        success, assign_time = courier.get_not_delivered_orders()
-        if success is not None:
-            if success != list():
-                return Response(
-                    {"orders": success, "assign_time": assign_time},
-                    status=status.HTTP_200_OK,
-                )
-            return Response({"orders": success}, status=status.HTTP_200_OK)
-
-        weight = courier.type.weight
-        orders = (
-            Order.objects.filter(
-                courier_id__isnull=True,
-                region__in=courier.regions_id,
-                weight__lte=weight,
+        with transaction.atomic():
+            courier = self.get_courier(courier_id)
+            if courier is None:
+                return Response(status=status.HTTP_400_BAD_REQUEST)
+
+            success, assign_time = courier.get_not_delivered_orders()
+            if success is not None:
+                if success != list():
+                    return Response(
+                        {"orders": success, "assign_time": assign_time},
+                        status=status.HTTP_200_OK,
+                    )
+                return Response({"orders": success}, status=status.HTTP_200_OK)
+
+            weight = courier_types.get(courier.type_id).weight
+            orders = self.get_orders(courier, weight)
+            success, assign_time = courier.assign_orders(
+                weight=weight, orders=orders, strategy=strategy
             )
-            .prefetch_related("delivery_hours")
-            .all()
-        )
-        success, assign_time = courier.assign_orders(weight=weight, orders=orders)
+            courier_cache.invalidate(courier.pk)
 
         if success != list():
             return Response(
@@ -95,6 +159,44 @@ class OrderAssignView(APIView):
         return Response({"orders": success}, status=status.HTTP_200_OK)
 
 
+class OrderAssignFleetView(APIView):
+    @swagger_auto_schema(
+        request_body=OrdersAssignFleetRequest(),
+        responses=ASSIGN_FLEET_RESPONSE,
+        operation_summary="Assign orders to many couriers at once",
+        tags=["Orders"],
+    )
+    def post(self, request, format=None):
+        courier_ids = (
+            request.data.get("courier_ids") if isinstance(request.data, dict) else None
+        )
+        if not isinstance(courier_ids, list) or not all(
+            isinstance(pk, int) for pk in courier_ids
+        ):
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        courier_ids = list(dict.fromkeys(courier_ids))
+
+        with transaction.atomic():
+            couriers = get_couriers(courier_ids)
+            found = {courier.pk for courier in couriers}
+            errors = [{"id": pk} for pk in courier_ids if pk not in found]
+            if errors:
+                return Response(
+                    {"validation_error": {"couriers": errors}},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            result = assign_fleet(couriers)
+
+        data = []
+        for courier_id in courier_ids:
+            orders, assign_time = result[courier_id]
+            item = {"courier_id": courier_id, "orders": [{"id": pk} for pk in orders]}
+            if orders:
+                item["assign_time"] = assign_time
+            data.append(item)
+        return Response({"couriers": data}, status=status.HTTP_200_OK)
+
+
 class OrderCompleteView(APIView):
     @swagger_auto_schema(
         request_body=OrdersCompletePostRequest(),
@@ -106,14 +208,90 @@ class OrderCompleteView(APIView):
         courier_id = request.data.get("courier_id")
         order_id = request.data.get("order_id")
         complete_time = request.data.get("complete_time")
-        order = Order.objects.filter(id=order_id, courier_id=courier_id).first()
-        if order is None:
-            return Response(status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            order = (
+                Order.objects.select_for_update()
+                .filter(id=order_id, courier_id=courier_id)
+                .first()
+            )
+            if order is None:
+                return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        if not order.is_delivered:
-            order.is_delivered = True
-            order.complete_time = complete_time
-            order.courier_price = 500 * order.courier.type.coefficient
-            order.save()
+            if not order.is_delivered:
+                order.is_delivered = True
+                order.complete_time = serializers.DateTimeField().to_internal_value(
+                    complete_time
+                )
+                courier_type = courier_types.get(order.courier.type_id)
+                order.courier_price = Order.BASE_PRICE * courier_type.coefficient
+                order.save()
+                order.courier.add_delivery(order)
+                courier_cache.invalidate(order.courier_id)
 
         return Response({"order_id": order_id}, status=status.HTTP_200_OK)
+
+
+class OrderCompleteBatchView(APIView):
+    @swagger_auto_schema(
+        request_body=OrdersCompleteItem(many=True),
+        responses=COMPLETE_BATCH_RESPONSE,
+        operation_summary="Marks many orders as completed",
+        tags=["Orders"],
+    )
+    def post(self, request, format=None):
+        data = request.data
+        if not isinstance(data, list):
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+
+        items = []
+        for item in data:
+            serializer = OrderCompleteSerializer(data=item)
+            items.append(serializer.validated_data if serializer.is_valid() else None)
+
+        results = []
+        completed = defaultdict(list)
+        with transaction.atomic():
+            orders = Order.objects.select_for_update().in_bulk(
+                [item["order_id"] for item in items if item is not None]
+            )
+            couriers = Courier.objects.in_bulk(
+                {order.courier_id for order in orders.values() if order.courier_id}
+            )
+
+            for raw, item in zip(data, items):
+                if item is None:
+                    order_id = raw.get("order_id") if isinstance(raw, dict) else None
+                    results.append({"order_id": order_id, "status": "invalid"})
+                    continue
+
+                order_id = item["order_id"]
+                order = orders.get(order_id)
+                if order is None or order.courier_id != item["courier_id"]:
+                    results.append({"order_id": order_id, "status": "not_found"})
+                    continue
+                if order.is_delivered:
+                    results.append(
+                        {"order_id": order_id, "status": "already_completed"}
+                    )
+                    continue
+
+                courier_type = courier_types.get(couriers[order.courier_id].type_id)
+                if courier_type is None:
+                    results.append({"order_id": order_id, "status": "invalid"})
+                    continue
+
+                order.is_delivered = True
+                order.complete_time = item["complete_time"]
+                order.courier_price = Order.BASE_PRICE * courier_type.coefficient
+                completed[order.courier_id].append(order)
+                results.append({"order_id": order_id, "status": "completed"})
+
+            for courier_id in sorted(completed):
+                courier_orders = completed[courier_id]
+                Order.objects.bulk_update(
+                    courier_orders, ["is_delivered", "complete_time", "courier_price"]
+                )
+                couriers[courier_id].add_deliveries(courier_orders)
+            courier_cache.invalidate(*completed)
+
+        return Response({"orders": results}, status=status.HTTP_200_OK)
@@ -50,7 +50,7 @@ INSTALLED_APPS += [
 ]
 
 INSTALLED_APPS += [
-    "api",
+    "api.apps.ApiConfig",
 ]
 
 MIDDLEWARE = [
@@ -104,6 +104,12 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.1/ref/settings/#caches
+
+CACHES = {"default": env.cache("CACHE_URL", "locmemcache://")}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -160,3 +166,20 @@ REST_FRAMEWORK = {
         "rest_framework.parsers.JSONParser",
     ],
 }
+
+API_BULK_IMPORT = env.bool("API_BULK_IMPORT", False)
+API_BULK_BATCH_SIZE = env.int("API_BULK_BATCH_SIZE", 1000)
+API_STREAMING_PARSER = env.bool("API_STREAMING_PARSER", False)
+API_STREAMING_CHUNK_SIZE = env.int("API_STREAMING_CHUNK_SIZE", 64 * 1024)
+API_ASSIGN_LOCKING = env.bool("API_ASSIGN_LOCKING", True)
+API_ASSIGN_STRATEGY = env.str("API_ASSIGN_STRATEGY", "greedy")
+API_KNAPSACK_MAX_ORDERS = env.int("API_KNAPSACK_MAX_ORDERS", 500)
+API_COURIER_CACHE = env.str("API_COURIER_CACHE", "none")
+API_COURIER_CACHE_SIZE = env.int("API_COURIER_CACHE_SIZE", 1024)
+API_COURIER_CACHE_TIMEOUT = env.int("API_COURIER_CACHE_TIMEOUT", 60)
+API_COURIER_TYPE_TIMEOUT = env.int("API_COURIER_TYPE_TIMEOUT", 5)
+API_ARCHIVE_AFTER_DAYS = env.int("API_ARCHIVE_AFTER_DAYS", 90)
+API_ARCHIVE_INTERVAL = env.int("API_ARCHIVE_INTERVAL", 60 * 60)
+API_ASYNC_WORKERS = env.int("API_ASYNC_WORKERS", 8)
+API_SCHEDULE_SLOTS = env.bool("API_SCHEDULE_SLOTS", False)
+API_FAST_SERIALIZERS = env.bool("API_FAST_SERIALIZERS", False)